@@ -0,0 +1,58 @@
+from argparse import ArgumentParser
+from collections.abc import Callable
+from datetime import timedelta
+from timeit import default_timer
+
+from rich.table import Table
+
+from benchmarks.generate import generate_readings
+from freyr import utils
+from freyr.console import CONSOLE
+from freyr.models import Reading
+from freyr.rollups import GROUPINGS
+
+
+def measure(func: Callable[[], object]) -> float:
+    start = default_timer()
+    func()
+    return default_timer() - start
+
+
+def main() -> None:
+    parser = ArgumentParser(prog="Aggregation Benchmark")
+    parser.add_argument("--readings", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    with CONSOLE.status(f"Generating {args.readings:,} readings"):
+        readings = [
+            Reading(**x)
+            for x in generate_readings(
+                device_id=1, count=args.readings, interval=timedelta(minutes=1)
+            )
+        ]
+        rows = [(x.timestamp, x.temperature, x.humidity) for x in readings]
+    load_time = measure(lambda: utils.ReadingColumns.from_rows(rows))
+    columns = utils.ReadingColumns.from_rows(rows)
+
+    table = Table(title=f"Aggregating {args.readings:,} readings")
+    table.add_column("Timeframe")
+    table.add_column("Before (s)", justify="right")
+    table.add_column("After (s)", justify="right")
+    table.add_column("Speedup", justify="right")
+    for timeframe, grouping in reversed(GROUPINGS.items()):
+        name = timeframe.value.lower()
+        functions = [getattr(utils, f"get_{name}_{x}_readings") for x in ("high", "average", "low")]
+        with CONSOLE.status(f"Aggregating {name}"):
+            before = measure(lambda functions=functions: [x(readings=readings) for x in functions])
+            after = measure(
+                lambda grouping=grouping: utils.summarize(columns=columns, grouping=grouping)
+            )
+        table.add_row(
+            timeframe.value.title(), f"{before:.3f}", f"{after:.3f}", f"{before / after:.1f}x"
+        )
+    CONSOLE.print(table)
+    CONSOLE.print(f"Building the columns took {load_time:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import random
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import pairwise
+from timeit import default_timer
+
+from rich.table import Table
+
+from freyr.console import CONSOLE
+from freyr.downsample import Row, lttb
+
+
+def generate_rows(count: int, seed: int = 0) -> list[Row]:
+    rng = random.Random(seed)  # noqa: S311
+    start = datetime(2020, 1, 1)
+    rows = []
+    for index in range(count):
+        # Leave a gap in the middle of the range, the chart should bridge it with few points.
+        if count // 3 <= index < count // 3 + count // 10:
+            continue
+        rows.append(
+            (
+                index,
+                start + timedelta(minutes=index),
+                Decimal(f"{rng.gauss(20, 3):.2f}") if rng.random() > 0.01 else None,
+                Decimal(f"{rng.gauss(60, 10):.2f}") if rng.random() > 0.01 else None,
+            )
+        )
+    spike = len(rows) // 2
+    rows[spike] = (rows[spike][0], rows[spike][1], Decimal("99.00"), rows[spike][3])
+    return rows
+
+
+def check(rows: list[Row], sampled: list[Row], points: int) -> list[str]:
+    problems = []
+    if len(sampled) > points:
+        problems.append(f"returned {len(sampled)} points")
+    if sampled[0] is not rows[0] or sampled[-1] is not rows[-1]:
+        problems.append("first or last reading missing")
+    if any(a[1] >= b[1] for a, b in pairwise(sampled)):
+        problems.append("points out of order")
+    if not any(x[2] == Decimal("99.00") for x in sampled):
+        problems.append("spike dropped")
+    return problems
+
+
+def main() -> None:
+    parser = ArgumentParser(prog="Downsample Benchmark")
+    parser.add_argument("--readings", type=int, default=1_000_000)
+    parser.add_argument("--points", type=int, nargs="+", default=[500, 1_000, 5_000])
+    args = parser.parse_args()
+
+    with CONSOLE.status(f"Generating {args.readings:,} readings"):
+        rows = generate_rows(count=args.readings)
+
+    table = Table(title=f"Downsampling {len(rows):,} readings")
+    table.add_column("Points", justify="right")
+    table.add_column("Returned", justify="right")
+    table.add_column("Time (s)", justify="right")
+    table.add_column("Readings/s", justify="right")
+    table.add_column("Checks")
+    failed = False
+    for points in args.points:
+        with CONSOLE.status(f"Downsampling to {points:,} points"):
+            start = default_timer()
+            sampled = lttb(rows=rows, points=points, start=rows[0][1], end=rows[-1][1])
+            elapsed = default_timer() - start
+        problems = check(rows=rows, sampled=sampled, points=points)
+        failed |= bool(problems)
+        table.add_row(
+            f"{points:,}",
+            f"{len(sampled):,}",
+            f"{elapsed:.3f}",
+            f"{len(rows) / elapsed:,.0f}",
+            ", ".join(problems) or "OK",
+        )
+    CONSOLE.print(table)
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import asyncio
+import math
+import random
+from argparse import ArgumentParser
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import islice
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from freyr.console import CONSOLE
+from freyr.constants import constants
+from freyr.models import Device, Reading
+from freyr.settings import Source
+
+START = datetime(2020, 1, 1)
+CHUNK_SIZE = 5_000
+
+
+def configure(database: Path) -> None:
+    # Must run before freyr.database is imported, the engine is created from these settings.
+    settings = constants.settings
+    settings.database.source = Source.SQLITE
+    settings.database.name = str(database)
+    settings.database.partitioned = False
+    settings.database.rollups = True
+    settings.cache.size = 0
+    settings.ingest.queued = False
+    settings.performance.profiling = False
+    settings.retention.enabled = False
+
+
+def generate_readings(
+    device_id: int,
+    count: int,
+    interval: timedelta,
+    gap_chance: float = 0.001,
+    gap_length: int = 60,
+    seed: int = 0,
+) -> Iterator[dict[str, Any]]:
+    rng = random.Random(seed * 1_000 + device_id)  # noqa: S311
+    timestamp = START
+    produced = 0
+    while produced < count:
+        # Outages skip gap_length intervals, as a sensor going offline would.
+        if rng.random() < gap_chance:
+            timestamp += interval * gap_length
+        hours = (timestamp - START) / timedelta(hours=1)
+        daily = math.sin(2 * math.pi * hours / 24)
+        yearly = math.sin(2 * math.pi * hours / 8766)
+        yield {
+            "device_id": device_id,
+            "timestamp": timestamp,
+            "temperature": (
+                Decimal(f"{15 + 8 * yearly + 4 * daily + rng.gauss(0, 1):.2f}")
+                if rng.random() > 0.01
+                else None
+            ),
+            "humidity": (
+                Decimal(f"{60 - 15 * daily + rng.gauss(0, 5):.2f}") if rng.random() > 0.01 else None
+            ),
+        }
+        timestamp += interval
+        produced += 1
+
+
+async def _populate(
+    devices: int,
+    readings: int,
+    interval: timedelta,
+    gap_chance: float = 0.001,
+    gap_length: int = 60,
+    seed: int = 0,
+) -> list[int]:
+    from freyr.database import create_db_and_tables, engine  # noqa: PLC0415
+    from freyr.rollups import rebuild_rollups  # noqa: PLC0415
+
+    await create_db_and_tables()
+    async with engine.begin() as connection:
+        device_ids = []
+        for index in range(1, devices + 1):
+            result = await connection.execute(
+                insert(Device).values(name=f"Device {index:03}").returning(Device.id)
+            )
+            device_ids.append(result.scalar_one())
+        for device_id in device_ids:
+            rows = generate_readings(
+                device_id=device_id,
+                count=readings,
+                interval=interval,
+                gap_chance=gap_chance,
+                gap_length=gap_length,
+                seed=seed,
+            )
+            while chunk := list(islice(rows, CHUNK_SIZE)):
+                await connection.execute(insert(Reading), chunk)
+    async with AsyncSession(engine) as session:
+        await rebuild_rollups(session=session)
+        await session.commit()
+    await engine.dispose()
+    return device_ids
+
+
+def populate(
+    database: Path,
+    devices: int,
+    readings: int,
+    interval: timedelta,
+    gap_chance: float = 0.001,
+    gap_length: int = 60,
+    seed: int = 0,
+) -> list[int]:
+    configure(database=database)
+    database.unlink(missing_ok=True)
+    return asyncio.run(
+        _populate(
+            devices=devices,
+            readings=readings,
+            interval=interval,
+            gap_chance=gap_chance,
+            gap_length=gap_length,
+            seed=seed,
+        )
+    )
+
+
+def main() -> None:
+    parser = ArgumentParser(prog="Benchmark Data Generator")
+    parser.add_argument(
+        "--database",
+        type=Path,
+        default=Path("benchmark.sqlite"),
+        help="SQLite file to fill, it is recreated on each run.",
+    )
+    parser.add_argument("--devices", type=int, default=5)
+    parser.add_argument("--readings", type=int, default=100_000, help="Readings per device.")
+    parser.add_argument("--interval", type=float, default=5, help="Minutes between readings.")
+    parser.add_argument("--gap-chance", type=float, default=0.001)
+    parser.add_argument("--gap-length", type=int, default=60, help="Readings missed per gap.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with CONSOLE.status(f"Generating {args.devices} x {args.readings:,} readings"):
+        populate(
+            database=args.database,
+            devices=args.devices,
+            readings=args.readings,
+            interval=timedelta(minutes=args.interval),
+            gap_chance=args.gap_chance,
+            gap_length=args.gap_length,
+            seed=args.seed,
+        )
+    CONSOLE.print(f"Created {args.database} with {args.devices * args.readings:,} readings")
+
+
+if __name__ == "__main__":
+    main()
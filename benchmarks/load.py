@@ -0,0 +1,276 @@
+import asyncio
+import contextlib
+import json
+import math
+import random
+from argparse import ArgumentParser, Namespace
+from datetime import datetime
+from pathlib import Path
+from timeit import default_timer
+from typing import Any, Self
+
+import httpx
+from rich.table import Table
+
+from freyr.console import CONSOLE
+from freyr.constants import constants
+
+READING = "POST /api/devices/{device_id}/readings"
+DASHBOARD = "GET /"
+DEVICES = "GET /api/devices"
+DEVICE_PAGE = "GET /{device_id}"
+SUMMARY = "GET /api/devices/{device_id}/readings/summary"
+
+
+class Recorder:
+    def __init__(self: Self) -> None:
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    async def request(
+        self: Self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs: Any
+    ) -> None:
+        start = default_timer()
+        try:
+            response = await client.request(method, url, **kwargs)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        self.latencies.setdefault(endpoint, []).append(default_timer() - start)
+        if failed:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+def percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+async def sensor(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    device_id: int,
+    interval: float,
+    rng: random.Random,
+) -> None:
+    loop = asyncio.get_running_loop()
+    # Spread the fleet out so the devices don't all post at the same moment.
+    await asyncio.sleep(rng.uniform(0, interval))
+    deadline = loop.time()
+    while True:
+        await recorder.request(
+            client,
+            READING,
+            "POST",
+            f"/api/devices/{device_id}/readings",
+            json={
+                "timestamp": datetime.now().isoformat(),
+                "temperature": round(rng.gauss(20, 3), 2),
+                "humidity": round(rng.gauss(60, 10), 2),
+            },
+        )
+        # A slow server delays the next reading, so falling short of the target rate shows
+        # the instance is saturated.
+        deadline += interval
+        await asyncio.sleep(max(deadline - loop.time(), 0))
+
+
+async def viewer(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    device_ids: list[int],
+    think: float,
+    rng: random.Random,
+) -> None:
+    while True:
+        device_id = rng.choice(device_ids)
+        await recorder.request(client, DASHBOARD, "GET", "/")
+        # The dashboard loads the devices with their latest readings once the page is open.
+        await recorder.request(client, DEVICES, "GET", "/api/devices")
+        await recorder.request(client, DEVICE_PAGE, "GET", f"/{device_id}")
+        await recorder.request(client, SUMMARY, "GET", f"/api/devices/{device_id}/readings/summary")
+        await asyncio.sleep(rng.expovariate(1 / think))
+
+
+async def create_devices(client: httpx.AsyncClient, start: int, count: int) -> list[int]:
+    device_ids = []
+    for index in range(start, start + count):
+        response = await client.post("/api/devices", json={"name": f"Load {index:04}"})
+        response.raise_for_status()
+        device_ids.append(response.json()["id"])
+    return device_ids
+
+
+async def run_stage(
+    client: httpx.AsyncClient,
+    device_ids: list[int],
+    viewers: int,
+    interval: float,
+    think: float,
+    duration: float,
+    seed: int,
+) -> Recorder:
+    recorder = Recorder()
+    rng = random.Random(seed)  # noqa: S311
+    tasks = [
+        asyncio.create_task(
+            sensor(
+                client=client,
+                recorder=recorder,
+                device_id=x,
+                interval=interval,
+                rng=random.Random(rng.random()),  # noqa: S311
+            )
+        )
+        for x in device_ids
+    ]
+    tasks.extend(
+        asyncio.create_task(
+            viewer(
+                client=client,
+                recorder=recorder,
+                device_ids=device_ids,
+                think=think,
+                rng=random.Random(rng.random()),  # noqa: S311
+            )
+        )
+        for _ in range(viewers)
+    )
+    await asyncio.sleep(duration)
+    for task in tasks:
+        task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await asyncio.gather(*tasks)
+    return recorder
+
+
+def summarize(recorder: Recorder, duration: float) -> dict[str, dict[str, float]]:
+    return {
+        name: {
+            "requests": len(latencies),
+            "throughput": len(latencies) / duration,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "errors": recorder.errors.get(name, 0) / len(latencies),
+        }
+        for name, latencies in recorder.latencies.items()
+    }
+
+
+def saturation(stage: dict[str, Any], max_p99: float, max_errors: float) -> str | None:
+    endpoints = stage["endpoints"]
+    if stage["achieved"] < stage["target"] * 0.95:
+        return f"{stage['achieved']:.1f} of {stage['target']:.1f} readings/s were accepted"
+    for name, result in endpoints.items():
+        if result["errors"] > max_errors:
+            return f"{result['errors']:.1%} of {name} requests failed"
+        if result["p99"] > max_p99:
+            return f"{name} p99 latency was {result['p99']:.2f}s"
+    return None
+
+
+def print_stage(stage: dict[str, Any]) -> None:
+    table = Table(
+        title=(
+            f"{stage['devices']} devices, {stage['viewers']} viewers:"
+            f" {stage['achieved']:.1f} of {stage['target']:.1f} readings/s"
+        )
+    )
+    table.add_column("Endpoint")
+    table.add_column("Requests", justify="right")
+    table.add_column("Req/s", justify="right")
+    table.add_column("p50 (ms)", justify="right")
+    table.add_column("p95 (ms)", justify="right")
+    table.add_column("p99 (ms)", justify="right")
+    table.add_column("Errors", justify="right")
+    for name, result in stage["endpoints"].items():
+        table.add_row(
+            name,
+            f"{result['requests']:,}",
+            f"{result['throughput']:.1f}",
+            f"{result['p50'] * 1000:.1f}",
+            f"{result['p95'] * 1000:.1f}",
+            f"{result['p99'] * 1000:.1f}",
+            f"{result['errors']:.1%}",
+        )
+    CONSOLE.print(table)
+
+
+async def run(args: Namespace) -> list[dict[str, Any]]:
+    stages = []
+    device_ids = []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        for devices in sorted(args.fleet):
+            device_ids.extend(
+                await create_devices(
+                    client=client, start=len(device_ids) + 1, count=devices - len(device_ids)
+                )
+            )
+            with CONSOLE.status(f"Running {devices} devices and {args.viewers} viewers"):
+                recorder = await run_stage(
+                    client=client,
+                    device_ids=device_ids,
+                    viewers=args.viewers,
+                    interval=args.interval,
+                    think=args.think,
+                    duration=args.duration,
+                    seed=args.seed,
+                )
+            endpoints = summarize(recorder=recorder, duration=args.duration)
+            stage = {
+                "devices": devices,
+                "viewers": args.viewers,
+                "target": devices / args.interval,
+                "achieved": (
+                    endpoints[READING]["throughput"] * (1 - endpoints[READING]["errors"])
+                    if READING in endpoints
+                    else 0.0
+                ),
+                "endpoints": endpoints,
+            }
+            print_stage(stage=stage)
+            stage["saturated"] = saturation(
+                stage=stage, max_p99=args.max_p99, max_errors=args.max_errors
+            )
+            stages.append(stage)
+            if stage["saturated"]:
+                break
+    return stages
+
+
+def main() -> None:
+    settings = constants.settings.website
+    parser = ArgumentParser(prog="Load Test")
+    parser.add_argument("--url", default=f"http://{settings.host}:{settings.port}")
+    parser.add_argument(
+        "--fleet",
+        type=int,
+        nargs="+",
+        default=[10, 50, 100, 250, 500, 1_000],
+        help="Number of devices in each stage, stages stop once the instance is saturated.",
+    )
+    parser.add_argument("--interval", type=float, default=5.0, help="Seconds between readings.")
+    parser.add_argument("--viewers", type=int, default=5)
+    parser.add_argument("--think", type=float, default=2.0, help="Mean seconds between views.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per stage.")
+    parser.add_argument("--max-p99", type=float, default=1.0, help="Seconds.")
+    parser.add_argument("--max-errors", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Save the results as JSON.")
+    args = parser.parse_args()
+
+    stages = asyncio.run(run(args=args))
+    if args.output:
+        args.output.write_text(json.dumps({"url": args.url, "stages": stages}, indent=2))
+    if saturated := next((x for x in stages if x["saturated"]), None):
+        CONSOLE.print(
+            f"[red]Saturated at {saturated['devices']} devices: {saturated['saturated']}[/]"
+        )
+    else:
+        CONSOLE.print(f"[green]Not saturated with up to {stages[-1]['devices']} devices[/]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import gc
+import json
+import logging
+import platform
+import statistics
+from argparse import ArgumentParser
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from itertools import count
+from pathlib import Path
+from timeit import default_timer
+from typing import Any, NamedTuple
+
+from rich.table import Table
+
+from benchmarks.generate import generate_readings, populate
+from freyr import utils
+from freyr.console import CONSOLE
+from freyr.models import Reading
+
+READING_FUNCTIONS = {
+    x: getattr(utils, x) for x in utils.__all__ if x.startswith("get_") and x.endswith("_readings")
+}
+SUMMARY_TIMEFRAMES = ("yearly", "monthly", "daily", "hourly")
+
+
+class Benchmark(NamedTuple):
+    name: str
+    func: Callable[[], object]
+    number: int = 1
+
+
+def measure(benchmark: Benchmark, repeat: int) -> list[float]:
+    # Each run is the average of `number` calls, so fast calls aren't lost in timer noise.
+    # Collection is paused while timing, as timeit does, so it doesn't land on random runs.
+    runs = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = default_timer()
+            for _ in range(benchmark.number):
+                benchmark.func()
+            runs.append((default_timer() - start) / benchmark.number)
+        finally:
+            gc.enable()
+    return runs
+
+
+def aggregation_benchmarks(readings: list[Reading]) -> list[Benchmark]:
+    return [
+        Benchmark(name=f"utils.{x}", func=lambda func=func: func(readings=readings))
+        for x, func in READING_FUNCTIONS.items()
+    ]
+
+
+def endpoint_benchmarks(client: Any, device_id: int, start: datetime) -> list[Benchmark]:  # noqa: ANN401
+    timestamps = (start + timedelta(minutes=x) for x in count())
+
+    def create_reading() -> None:
+        client.post(
+            "/api/readings",
+            json={
+                "device_id": device_id,
+                "timestamp": next(timestamps).isoformat(),
+                "temperature": 20.5,
+                "humidity": 55.25,
+            },
+        ).raise_for_status()
+
+    benchmarks = [
+        Benchmark(
+            name=f"api.{x}_readings",
+            func=lambda x=x: client.get(
+                f"/api/devices/{device_id}/readings/{x}"
+            ).raise_for_status(),
+            number=5,
+        )
+        for x in SUMMARY_TIMEFRAMES
+    ]
+    benchmarks.append(
+        Benchmark(
+            name="api.list_devices",
+            func=lambda: client.get("/api/devices").raise_for_status(),
+            number=20,
+        )
+    )
+    benchmarks.append(Benchmark(name="api.create_reading", func=create_reading, number=20))
+    return benchmarks
+
+
+def compare(
+    results: dict[str, dict[str, Any]], baseline: dict[str, dict[str, Any]]
+) -> dict[str, float]:
+    # The fastest run is the least affected by other load on the machine.
+    return {x: y["min"] / baseline[x]["min"] - 1 for x, y in results.items() if x in baseline}
+
+
+def print_results(
+    title: str,
+    results: dict[str, dict[str, Any]],
+    baseline: dict[str, dict[str, Any]],
+    changes: dict[str, float],
+    threshold: float,
+) -> None:
+    table = Table(title=title)
+    table.add_column("Benchmark")
+    table.add_column("Min (ms)", justify="right")
+    table.add_column("Median (ms)", justify="right")
+    if baseline:
+        table.add_column("Baseline (ms)", justify="right")
+        table.add_column("Change", justify="right")
+    for name, result in results.items():
+        row = [name, f"{result['min'] * 1000:.3f}", f"{result['median'] * 1000:.3f}"]
+        if baseline:
+            change = changes.get(name)
+            style = (
+                "red" if (change or 0) > threshold else "green" if (change or 0) < 0 else "default"
+            )
+            row.extend(
+                [
+                    f"{baseline[name]['min'] * 1000:.3f}" if name in baseline else "-",
+                    f"[{style}]{change:+.1%}[/]" if change is not None else "-",
+                ]
+            )
+        table.add_row(*row)
+    CONSOLE.print(table)
+
+
+def main() -> None:
+    parser = ArgumentParser(prog="Benchmark Suite")
+    parser.add_argument("--database", type=Path, default=Path("benchmark.sqlite"))
+    parser.add_argument("--devices", type=int, default=5)
+    parser.add_argument("--readings", type=int, default=100_000, help="Readings per device.")
+    parser.add_argument("--interval", type=float, default=5, help="Minutes between readings.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, default=Path("benchmark.json"))
+    parser.add_argument("--baseline", type=Path, help="Results of an earlier run to compare with.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Fail when a benchmark's fastest run is this fraction slower than the baseline.",
+    )
+    args = parser.parse_args()
+    parameters = {
+        "devices": args.devices,
+        "readings": args.readings,
+        "interval": args.interval,
+        "seed": args.seed,
+        "repeat": args.repeat,
+    }
+
+    interval = timedelta(minutes=args.interval)
+    with CONSOLE.status(f"Generating {args.devices} x {args.readings:,} readings"):
+        device_ids = populate(
+            database=args.database,
+            devices=args.devices,
+            readings=args.readings,
+            interval=interval,
+            seed=args.seed,
+        )
+        readings = [
+            Reading(**x)
+            for x in generate_readings(
+                device_id=device_ids[0], count=args.readings, interval=interval, seed=args.seed
+            )
+        ]
+
+    from fastapi.testclient import TestClient  # noqa: PLC0415
+
+    from freyr.__main__ import app  # noqa: PLC0415
+
+    results = {}
+    with TestClient(app) as client:
+        for name in ("freyr", "httpx"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+        benchmarks = [
+            *aggregation_benchmarks(readings=readings),
+            *endpoint_benchmarks(
+                client=client, device_id=device_ids[0], start=readings[-1].timestamp + interval
+            ),
+        ]
+        for benchmark in benchmarks:
+            with CONSOLE.status(f"Running {benchmark.name}"):
+                runs = measure(benchmark=benchmark, repeat=args.repeat)
+            results[benchmark.name] = {
+                "median": statistics.median(runs),
+                "min": min(runs),
+                "runs": runs,
+            }
+
+    args.output.write_text(
+        json.dumps(
+            {
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "parameters": parameters,
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+
+    baseline = {}
+    if args.baseline:
+        content = json.loads(args.baseline.read_text())
+        if content["parameters"] != parameters:
+            CONSOLE.print(f"[yellow]{args.baseline} was run with {content['parameters']}[/]")
+        baseline = content["results"]
+    changes = compare(results=results, baseline=baseline)
+    regressions = [x for x, y in changes.items() if y > args.threshold]
+    print_results(
+        title=f"{args.devices} x {args.readings:,} readings",
+        results=results,
+        baseline=baseline,
+        changes=changes,
+        threshold=args.threshold,
+    )
+
+    CONSOLE.print(f"Saved the results to {args.output}")
+    if regressions:
+        CONSOLE.print(
+            f"[red]{len(regressions)} benchmarks are more than {args.threshold:.0%} slower[/]"
+        )
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
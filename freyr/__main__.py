@@ -1,4 +1,5 @@
 import logging
+import os
 from datetime import datetime
 from http import HTTPStatus
 
@@ -9,9 +10,15 @@
 
 from freyr import __version__, elapsed_timer, get_project, setup_logging
 from freyr.constants import constants
-from freyr.database import create_db_and_tables
+from freyr.database import PARTITION_TASK, SCHEMA_READY, create_db_and_tables, engine, log_profile
+from freyr.events import EVENT_HUB, close_on_exit
+from freyr.ingest import INGEST_QUEUE
+from freyr.metrics import METRICS, track_queries
+from freyr.profiling import profile_queries
+from freyr.retention import RETENTION_TASK
 from freyr.routers.api import router as api_router
 from freyr.routers.html import router as html_router
+from freyr.routers.metrics import router as metrics_router
 
 LOGGER = logging.getLogger("freyr")
 
@@ -19,6 +26,8 @@
 def create_app() -> FastAPI:
     _app = FastAPI(title="Freyr", version=__version__)
     _app.mount("/static", StaticFiles(directory=get_project() / "static"), name="static")
+    # Registered before the HTML routes so /metrics isn't taken for a device id.
+    _app.include_router(metrics_router)
     _app.include_router(html_router)
     _app.include_router(api_router)
     return _app
@@ -30,8 +39,17 @@ def create_app() -> FastAPI:
 @app.on_event(event_type="startup")
 async def startup_event() -> None:
     setup_logging()
-
-    create_db_and_tables()
+    close_on_exit()
+
+    log_profile()
+    if not os.environ.get(SCHEMA_READY):
+        await create_db_and_tables()
+    if constants.settings.ingest.queued:
+        INGEST_QUEUE.start()
+    if constants.settings.database.partitioned:
+        PARTITION_TASK.start()
+    if constants.settings.retention.enabled:
+        RETENTION_TASK.start()
 
     LOGGER.info(
         "Listening on %s:%s", constants.settings.website.host, constants.settings.website.port
@@ -39,12 +57,37 @@ async def startup_event() -> None:
     LOGGER.info("%s v%s started", app.title, app.version)
 
 
+@app.on_event(event_type="shutdown")
+async def shutdown_event() -> None:
+    EVENT_HUB.close()
+    await RETENTION_TASK.stop()
+    await PARTITION_TASK.stop()
+    await INGEST_QUEUE.stop()
+    await engine.dispose()
+
+
 @app.middleware(middleware_type="http")
 async def logger_middleware(request: Request, call_next):  # noqa: ANN001, ANN201
     log_message = f"{request.method.upper():<7} {request.scope['path']}"
     LOGGER.debug(log_message)
-    with elapsed_timer() as elapsed:
-        response = await call_next(request)
+    METRICS.in_flight.value += 1
+    try:
+        with elapsed_timer() as elapsed, track_queries() as stats, profile_queries() as profile:
+            response = await call_next(request)
+    finally:
+        METRICS.in_flight.value -= 1
+    # Route templates keep the label count bounded, unmatched paths share one label.
+    route = getattr(request.scope.get("route"), "path", "<unmatched>")
+    METRICS.observe_request(
+        method=request.method.upper(),
+        route=route,
+        status=response.status_code,
+        seconds=elapsed(),
+        stats=stats,
+    )
+    if profile is not None:
+        profile.report(request=f"{request.method.upper()} {route}")
+        response.headers["Server-Timing"] = profile.server_timing(total=elapsed())
     log_message += f" - {response.status_code} => {elapsed():.2f}s"
     if response.status_code < 400:
         LOGGER.info(log_message)
@@ -0,0 +1,129 @@
+__all__ = ["SUMMARY_CACHE", "CacheEntry", "CacheKey", "SummaryCache", "mark_changed"]
+
+from collections import OrderedDict
+from collections.abc import Iterable
+from hashlib import blake2b
+from time import monotonic
+from typing import NamedTuple, Self
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from freyr.constants import constants
+from freyr.models import CacheStats, Timeframe
+
+CHANGED_DEVICES = "freyr.changed_devices"
+
+
+class CacheKey(NamedTuple):
+    device_id: int
+    generation: int
+    timeframes: tuple[Timeframe, ...]
+    year: int | None
+    month: int | None
+    day: int | None
+    offset: int
+    limit: int
+    media_type: str
+
+
+class CacheEntry(NamedTuple):
+    content: bytes
+    etag: str
+    expires: float
+
+
+class SummaryCache:
+    def __init__(self: Self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[CacheKey, CacheEntry] = OrderedDict()
+        self._generations: dict[int, int] = {}
+
+    def key(
+        self: Self,
+        device_id: int,
+        timeframes: tuple[Timeframe, ...],
+        year: int | None,
+        month: int | None,
+        day: int | None,
+        offset: int,
+        limit: int,
+        media_type: str,
+    ) -> CacheKey:
+        return CacheKey(
+            device_id=device_id,
+            generation=self._generations.get(device_id, 0),
+            timeframes=timeframes,
+            year=year,
+            month=month,
+            day=day,
+            offset=offset,
+            limit=limit,
+            media_type=media_type,
+        )
+
+    def get(self: Self, key: CacheKey) -> CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires < monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self: Self, key: CacheKey, content: bytes) -> CacheEntry:
+        entry = CacheEntry(
+            content=content,
+            etag=f'"{blake2b(content, digest_size=16).hexdigest()}"',
+            expires=monotonic() + self.ttl,
+        )
+        if self.maxsize > 0:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self: Self, device_ids: Iterable[int]) -> None:
+        device_ids = set(device_ids)
+        if not device_ids:
+            return
+        for device_id in device_ids:
+            self._generations[device_id] = self._generations.get(device_id, 0) + 1
+        for key in [x for x in self._entries if x.device_id in device_ids]:
+            del self._entries[key]
+
+    def stats(self: Self) -> CacheStats:
+        return CacheStats(
+            size=len(self._entries),
+            maxsize=self.maxsize,
+            ttl=self.ttl,
+            hits=self.hits,
+            misses=self.misses,
+        )
+
+
+SUMMARY_CACHE = SummaryCache(
+    maxsize=constants.settings.cache.size, ttl=constants.settings.cache.ttl
+)
+
+
+def mark_changed(session: AsyncSession, device_ids: Iterable[int]) -> None:
+    session.info.setdefault(CHANGED_DEVICES, set()).update(device_ids)
+
+
+# Bumping the generation only once the readings are committed stops a concurrent request from
+# caching the pre-commit summary under the new generation.
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed(session: Session) -> None:
+    SUMMARY_CACHE.invalidate(device_ids=session.info.pop(CHANGED_DEVICES, ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed(session: Session) -> None:
+    session.info.pop(CHANGED_DEVICES, None)
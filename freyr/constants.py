@@ -9,7 +9,7 @@
 class Constants:
     @cached_property
     def settings(self: Self) -> Settings:
-        return Settings.load().save()
+        return Settings.load()
 
 
 constants = Constants()
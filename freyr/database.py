@@ -1,18 +1,315 @@
-from sqlmodel import Session, SQLModel, create_engine
+import logging
+import os
+import socket
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Any, NamedTuple, Self
+
+from sqlalchemy import (
+    Column,
+    ColumnElement,
+    Connection,
+    Index,
+    MetaData,
+    Table,
+    delete,
+    event,
+    func,
+    inspect,
+    or_,
+    select,
+    text,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from freyr.constants import constants
-from freyr.settings import Source
+from freyr.metrics import METRICS
+from freyr.models import Lease, Reading
+from freyr.partitions import create_partitioned_table, ensure_partitions
+from freyr.profiling import instrument
+from freyr.settings import Profile, Source
+from freyr.tasks import PeriodicTask
 
-connect_args = (
-    {"check_same_thread": False} if constants.settings.database.source == Source.SQLITE else {}
-)
-engine = create_engine(constants.settings.database.db_url, echo=False, connect_args=connect_args)
+LOGGER = logging.getLogger(__name__)
+# Set by run.py once the schema is up to date, so its workers skip creating it.
+SCHEMA_READY = "FREYR_SCHEMA_READY"
+# Postgres advisory lock key held while changing the schema.
+SCHEMA_LOCK = 0x46524559
+# Readings removed by `Freyr --dedupe` are copied here first.
+DUPLICATES_TABLE = f"{Reading.__tablename__}_duplicates"
+
+
+class Tuning(NamedTuple):
+    # SQLite
+    journal_mode: str
+    synchronous: str
+    mmap_size: int
+    cache_size: int
+    busy_timeout: int
+    # Connection pool
+    pool_size: int
+    max_overflow: int
+    pool_pre_ping: bool
+    # Postgres
+    prepare_threshold: int | None
+    statement_timeout: int
+
+
+PROFILES = {
+    Profile.DEFAULT: Tuning(
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        mmap_size=0,
+        cache_size=-16_000,
+        busy_timeout=5_000,
+        pool_size=5,
+        max_overflow=10,
+        pool_pre_ping=True,
+        prepare_threshold=5,
+        statement_timeout=30_000,
+    ),
+    Profile.READ_HEAVY: Tuning(
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        mmap_size=1_073_741_824,
+        cache_size=-128_000,
+        busy_timeout=5_000,
+        pool_size=20,
+        max_overflow=20,
+        pool_pre_ping=True,
+        prepare_threshold=1,
+        statement_timeout=15_000,
+    ),
+    Profile.WRITE_HEAVY: Tuning(
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        mmap_size=268_435_456,
+        cache_size=-64_000,
+        busy_timeout=15_000,
+        pool_size=10,
+        max_overflow=10,
+        pool_pre_ping=False,
+        prepare_threshold=5,
+        statement_timeout=60_000,
+    ),
+}
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self: Self) -> ConnectionPoolEntry:
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            METRICS.checkout.observe(perf_counter() - start)
+
+
+def _create_engine() -> AsyncEngine:
+    settings = constants.settings.database
+    tuning = PROFILES[constants.settings.performance.profile]
+    connect_args = {}
+    if settings.source == Source.POSTGRES:
+        connect_args = {
+            "prepare_threshold": tuning.prepare_threshold,
+            "options": f"-c statement_timeout={tuning.statement_timeout}",
+        }
+    _engine = create_async_engine(
+        settings.db_url,
+        echo=False,
+        connect_args=connect_args,
+        # aiosqlite defaults to a NullPool, reuse connections for both sources instead.
+        poolclass=TimedQueuePool,
+        pool_size=tuning.pool_size if settings.pool_size is None else settings.pool_size,
+        max_overflow=(
+            tuning.max_overflow if settings.max_overflow is None else settings.max_overflow
+        ),
+        pool_pre_ping=tuning.pool_pre_ping,
+    )
+    if settings.source == Source.SQLITE:
+
+        @event.listens_for(_engine.sync_engine, "connect")
+        def apply_pragmas(
+            dbapi_connection: Any,  # noqa: ANN401
+            connection_record: ConnectionPoolEntry,  # noqa: ARG001
+        ) -> None:
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"PRAGMA journal_mode={tuning.journal_mode}")
+            cursor.execute(f"PRAGMA synchronous={tuning.synchronous}")
+            cursor.execute(f"PRAGMA mmap_size={tuning.mmap_size}")
+            cursor.execute(f"PRAGMA cache_size={tuning.cache_size}")
+            cursor.execute(f"PRAGMA busy_timeout={tuning.busy_timeout}")
+            cursor.close()
+
+    return _engine
+
+
+engine = _create_engine()
+METRICS.instrument(engine=engine.sync_engine)
+instrument(engine=engine.sync_engine)
+
+
+def _reset_after_fork() -> None:
+    # Pooled connections belong to the parent, the child opens its own without closing them.
+    engine.sync_engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def log_profile() -> None:
+    profile = constants.settings.performance.profile
+    pool = engine.pool
+    LOGGER.info(
+        "Applied the %s performance profile to %s (pool_size=%d, max_overflow=%d)",
+        profile.value,
+        constants.settings.database.source.value,
+        pool.size(),
+        pool._max_overflow,  # noqa: SLF001
+    )
+    LOGGER.debug("Profile settings: %s", PROFILES[profile])
+
+
+def _duplicates(index: Index) -> ColumnElement:
+    keep = select(func.min(Reading.id)).group_by(*index.columns)
+    return Reading.id.not_in(keep)
 
 
-def create_db_and_tables() -> None:
-    SQLModel.metadata.create_all(engine)
+def _unique_readings(connection: Connection) -> None:
+    indexes = {x["name"] for x in inspect(connection).get_indexes(Reading.__tablename__)}
+    for index in Reading.__table__.indexes:
+        if not index.unique or index.name in indexes:
+            continue
+        count = connection.execute(
+            select(func.count()).select_from(Reading).where(_duplicates(index=index))
+        ).scalar_one()
+        if count:
+            msg = (
+                f"{count} duplicate readings prevent creating {index.name}, run `Freyr --dedupe`"
+                f" to move them to {DUPLICATES_TABLE}"
+            )
+            raise RuntimeError(msg)
+        index.create(connection)
+        LOGGER.info("Created index %s", index.name)
 
 
-def get_session() -> Session:
-    with Session(engine) as session:
+def _remove_duplicates(connection: Connection) -> int:
+    if not inspect(connection).has_table(Reading.__tablename__):
+        return 0
+    backup = Table(
+        DUPLICATES_TABLE, MetaData(), *(Column(x.name, x.type) for x in Reading.__table__.columns)
+    )
+    backup.create(connection, checkfirst=True)
+    count = 0
+    for index in Reading.__table__.indexes:
+        if not index.unique:
+            continue
+        duplicates = _duplicates(index=index)
+        connection.execute(
+            backup.insert().from_select(
+                [x.name for x in backup.columns],
+                select(*Reading.__table__.columns).where(duplicates),
+            )
+        )
+        count += connection.execute(delete(Reading).where(duplicates)).rowcount
+    return count
+
+
+def _missing_indexes(connection: Connection) -> None:
+    for table in SQLModel.metadata.sorted_tables:
+        indexes = {x["name"] for x in inspect(connection).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in indexes:
+                continue
+            index.create(connection)
+            LOGGER.info("Created index %s", index.name)
+
+
+MIGRATIONS = [_unique_readings, _missing_indexes]
+
+
+async def _lock_schema(connection: AsyncConnection) -> None:
+    # Workers starting together wait for the first one instead of racing to change the schema.
+    if constants.settings.database.source == Source.POSTGRES:
+        await connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK})
+    else:
+        await connection.exec_driver_sql("BEGIN EXCLUSIVE")
+
+
+def _schema_current(connection: Connection) -> bool:
+    if connection.dialect.name == "postgresql":
+        query = text(
+            "SELECT tablename FROM pg_tables WHERE schemaname = current_schema()"
+            " UNION ALL SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()"
+        )
+    else:
+        query = text("SELECT name FROM sqlite_master WHERE type IN ('table', 'index')")
+    existing = set(connection.execute(query).scalars())
+    expected = {x.name for x in SQLModel.metadata.sorted_tables}
+    expected.update(x.name for y in SQLModel.metadata.sorted_tables for x in y.indexes)
+    return expected <= existing
+
+
+async def create_db_and_tables() -> None:
+    async with engine.begin() as connection:
+        # Only upgrades change the schema, so most starts can skip inspecting every table.
+        # Partitions still need checking as they are created by date.
+        if not constants.settings.database.partitioned and await connection.run_sync(
+            _schema_current
+        ):
+            return
+        await _lock_schema(connection=connection)
+        if constants.settings.database.partitioned:
+            await connection.run_sync(create_partitioned_table)
+        await connection.run_sync(SQLModel.metadata.create_all)
+        for migration in MIGRATIONS:
+            await connection.run_sync(migration)
+        await connection.run_sync(ensure_partitions)
+
+
+async def remove_duplicate_readings() -> int:
+    async with engine.begin() as connection:
+        await _lock_schema(connection=connection)
+        return await connection.run_sync(_remove_duplicates)
+
+
+async def create_partitions() -> None:
+    async with engine.begin() as connection:
+        await _lock_schema(connection=connection)
+        await connection.run_sync(ensure_partitions)
+
+
+# Partitions are created months ahead, checking daily keeps them ahead of long running servers.
+PARTITION_TASK = PeriodicTask(name="freyr-partitions", interval=86_400, job=create_partitions)
+
+
+async def get_session() -> AsyncIterator[AsyncSession]:
+    async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
+
+
+def insert(table: type[SQLModel]) -> postgresql.Insert | sqlite.Insert:
+    if constants.settings.database.source == Source.POSTGRES:
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+async def acquire_lease(name: str, duration: float) -> bool:
+    now = datetime.now()
+    statement = insert(Lease).values(
+        name=name,
+        owner=f"{socket.gethostname()}:{os.getpid()}",
+        expires=now + timedelta(seconds=duration),
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[Lease.name],
+        set_={"owner": statement.excluded.owner, "expires": statement.excluded.expires},
+        where=or_(Lease.expires < now, Lease.owner == statement.excluded.owner),
+    )
+    async with engine.begin() as connection:
+        return (await connection.execute(statement)).rowcount > 0
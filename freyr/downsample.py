@@ -0,0 +1,122 @@
+__all__ = ["Downsampler", "Row", "lttb"]
+
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+from typing import Any, Self
+
+# (id, timestamp, temperature, humidity), the column order of ReadingPublic rows.
+Row = Sequence[Any]
+# Each point holds the row, its offset in seconds, temperature and humidity.
+Point = tuple[Row, float, float | None, float | None]
+EPOCH = datetime(1970, 1, 1)
+
+
+def _to_point(row: Row) -> Point:
+    _, timestamp, temperature, humidity = row
+    return (
+        row,
+        (timestamp - EPOCH).total_seconds(),
+        float(temperature) if temperature is not None else None,
+        float(humidity) if humidity is not None else None,
+    )
+
+
+def _centroid(bucket: list[Point]) -> tuple[float, float | None, float | None]:
+    x_total = temp_total = hum_total = 0.0
+    temp_count = hum_count = 0
+    for _, x, temperature, humidity in bucket:
+        x_total += x
+        if temperature is not None:
+            temp_total += temperature
+            temp_count += 1
+        if humidity is not None:
+            hum_total += humidity
+            hum_count += 1
+    return (
+        x_total / len(bucket),
+        temp_total / temp_count if temp_count else None,
+        hum_total / hum_count if hum_count else None,
+    )
+
+
+class Downsampler:
+    # Largest-Triangle-Three-Buckets over equal time buckets between the first and last row.
+    # Rows must be added in ascending timestamp order, only the bucket being decided and the
+    # one after it are held in memory so rows can be fed straight from a database cursor.
+    # Both series contribute to the triangle area, gaps in a series contribute nothing.
+    def __init__(self: Self, points: int, start: datetime, end: datetime) -> None:
+        # The first and last rows are always kept, so at least one bucket sits between them.
+        self.buckets = max(points - 2, 1)
+        self.start = (start - EPOCH).total_seconds()
+        self.width = ((end - EPOCH).total_seconds() - self.start) / self.buckets or 1.0
+        self.selected: list[Row] = []
+        self._previous: Point | None = None
+        self._pending: Point | None = None
+        self._current: list[Point] = []
+        self._current_index = -1
+        self._next: list[Point] = []
+        self._next_index = -1
+
+    def _select(self: Self, target: tuple[float, float | None, float | None]) -> None:
+        _, ax, a_temp, a_hum = self._previous
+        cx, c_temp, c_hum = target
+        best, best_area = self._current[0], -1.0
+        for point in self._current:
+            _, bx, b_temp, b_hum = point
+            area = 0.0
+            if a_temp is not None and b_temp is not None and c_temp is not None:
+                area += abs((ax - cx) * (b_temp - a_temp) - (ax - bx) * (c_temp - a_temp))
+            if a_hum is not None and b_hum is not None and c_hum is not None:
+                area += abs((ax - cx) * (b_hum - a_hum) - (ax - bx) * (c_hum - a_hum))
+            if area > best_area:
+                best, best_area = point, area
+        self.selected.append(best[0])
+        self._previous = best
+
+    def _place(self: Self, point: Point) -> None:
+        index = int((point[1] - self.start) / self.width)
+        if index >= self.buckets:
+            index = self.buckets - 1
+        if index == self._current_index:
+            self._current.append(point)
+        elif not self._current:
+            self._current, self._current_index = [point], index
+        elif index == self._next_index or not self._next:
+            self._next.append(point)
+            self._next_index = index
+        else:
+            self._select(target=_centroid(bucket=self._next))
+            self._current, self._current_index = self._next, self._next_index
+            self._next, self._next_index = [point], index
+
+    def add(self: Self, row: Row) -> None:
+        point = _to_point(row=row)
+        if self._previous is None:
+            self.selected.append(row)
+            self._previous = point
+            return
+        # The newest row is held back so the last row is always kept as the final point.
+        if self._pending is not None:
+            self._place(point=self._pending)
+        self._pending = point
+
+    def result(self: Self) -> list[Row]:
+        if self._pending is None:
+            return self.selected
+        last = self._pending
+        if self._current:
+            self._select(target=_centroid(bucket=self._next) if self._next else last[1:])
+        if self._next:
+            self._current = self._next
+            self._select(target=last[1:])
+        self.selected.append(last[0])
+        self._pending = None
+        self._current, self._next = [], []
+        return self.selected
+
+
+def lttb(rows: Iterable[Row], points: int, start: datetime, end: datetime) -> list[Row]:
+    downsampler = Downsampler(points=points, start=start, end=end)
+    for row in rows:
+        downsampler.add(row=row)
+    return downsampler.result()
@@ -0,0 +1,136 @@
+__all__ = ["EVENT_HUB", "EventHub", "Subscription", "close_on_exit", "event_stream", "publish"]
+
+import asyncio
+import logging
+import signal
+import threading
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from contextlib import contextmanager
+from types import FrameType
+from typing import Self
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from freyr.constants import constants
+from freyr.models import Reading, ReadingEvent
+
+LOGGER = logging.getLogger(__name__)
+PENDING_READINGS = "freyr.pending_readings"
+
+
+class Subscription:
+    def __init__(self: Self, device_id: int | None, maxsize: int) -> None:
+        self.device_id = device_id
+        self.missed = 0
+        self.closed = False
+        self._queue: asyncio.Queue[ReadingEvent | None] = asyncio.Queue(maxsize=maxsize)
+
+    def put(self: Self, reading: ReadingEvent) -> None:
+        if self.device_id is not None and reading.device_id != self.device_id:
+            return
+        # A slow client loses its oldest readings instead of growing the buffer.
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.missed += 1
+        self._queue.put_nowait(reading)
+
+    def close(self: Self) -> None:
+        # None wakes a waiting get, making room for it if the buffer is full.
+        self.closed = True
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    async def get(self: Self, timeout: float) -> ReadingEvent | None:  # noqa: ASYNC109
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+        except TimeoutError:
+            return None
+
+
+class EventHub:
+    def __init__(self: Self, buffer_size: int) -> None:
+        self.buffer_size = buffer_size
+        self._subscriptions: set[Subscription] = set()
+
+    def __len__(self: Self) -> int:
+        return len(self._subscriptions)
+
+    @contextmanager
+    def subscribe(self: Self, device_id: int | None = None) -> Iterator[Subscription]:
+        subscription = Subscription(device_id=device_id, maxsize=self.buffer_size)
+        self._subscriptions.add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._subscriptions.discard(subscription)
+
+    def broadcast(self: Self, readings: Iterable[Reading]) -> None:
+        if not self._subscriptions:
+            return
+        for reading in readings:
+            public = ReadingEvent.model_validate(reading)
+            for subscription in self._subscriptions:
+                subscription.put(reading=public)
+
+    def close(self: Self) -> None:
+        for subscription in self._subscriptions:
+            subscription.close()
+
+
+EVENT_HUB = EventHub(buffer_size=constants.settings.stream.buffer_size)
+
+
+def close_on_exit() -> None:
+    # Uvicorn waits for open connections to finish before the shutdown event runs, so streams
+    # are closed as soon as the exit signal arrives instead.
+    if threading.current_thread() is not threading.main_thread():
+        return
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(signum)
+        if not callable(previous):
+            continue
+
+        def handler(signum: int, frame: FrameType | None, previous: Callable = previous) -> None:
+            loop.call_soon_threadsafe(EVENT_HUB.close)
+            previous(signum, frame)
+
+        signal.signal(signum, handler)
+
+
+async def event_stream(request: Request, device_id: int | None = None) -> AsyncIterator[str]:
+    keepalive = constants.settings.stream.keepalive
+    with EVENT_HUB.subscribe(device_id=device_id) as subscription:
+        yield "retry: 5000\n\n"
+        while not await request.is_disconnected():
+            reading = await subscription.get(timeout=keepalive)
+            if subscription.closed:
+                return
+            if subscription.missed:
+                # Clients reload the affected data as they can't tell which readings were dropped.
+                yield f"event: missed\ndata: {subscription.missed}\n\n"
+                subscription.missed = 0
+            if reading is None:
+                # Comments keep proxies from closing idle connections.
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: reading\ndata: {reading.model_dump_json()}\n\n"
+
+
+def publish(session: AsyncSession, readings: Iterable[Reading]) -> None:
+    session.info.setdefault(PENDING_READINGS, []).extend(readings)
+
+
+# Readings are only pushed once committed so clients never see a reading that was rolled back.
+@event.listens_for(Session, "after_commit")
+def _broadcast_pending(session: Session) -> None:
+    EVENT_HUB.broadcast(readings=session.info.pop(PENDING_READINGS, ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(PENDING_READINGS, None)
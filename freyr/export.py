@@ -0,0 +1,85 @@
+__all__ = ["export_readings"]
+
+import csv
+import json
+import zlib
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from io import StringIO
+
+from sqlalchemy import Row
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from freyr.database import engine
+from freyr.models import ExportFormat, Reading
+from freyr.queries import range_filters
+
+CHUNK_SIZE = 1_000
+CSV_HEADER = ("id", "timestamp", "temperature", "humidity")
+
+
+def _encode_csv(rows: Sequence[Row]) -> bytes:
+    buffer = StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows(
+        (id_, timestamp.isoformat(), temperature, humidity)
+        for id_, timestamp, temperature, humidity in rows
+    )
+    return buffer.getvalue().encode()
+
+
+def _encode_ndjson(rows: Sequence[Row]) -> bytes:
+    return "".join(
+        json.dumps(
+            {
+                "id": id_,
+                "timestamp": timestamp.isoformat(),
+                "temperature": str(temperature) if temperature is not None else None,
+                "humidity": str(humidity) if humidity is not None else None,
+            }
+        )
+        + "\n"
+        for id_, timestamp, temperature, humidity in rows
+    ).encode()
+
+
+async def _stream_rows(
+    device_id: int, export_format: ExportFormat, start: datetime | None, end: datetime | None
+) -> AsyncIterator[bytes]:
+    query = (
+        select(Reading.id, Reading.timestamp, Reading.temperature, Reading.humidity)
+        .where(Reading.device_id == device_id)
+        .where(*range_filters(column=Reading.timestamp, start=start, end=end))
+        .order_by(Reading.timestamp)
+        .execution_options(yield_per=CHUNK_SIZE)
+    )
+
+    encode = _encode_csv if export_format == ExportFormat.CSV else _encode_ndjson
+    if export_format == ExportFormat.CSV:
+        yield (",".join(CSV_HEADER) + "\n").encode()
+    # The request's session is closed before the response body is sent, so the export
+    # holds its own connection for as long as the stream is open.
+    async with AsyncSession(engine) as session:
+        result = await session.stream(query)
+        async for rows in result.partitions():
+            yield encode(rows)
+
+
+async def export_readings(
+    device_id: int,
+    export_format: ExportFormat,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    chunks = _stream_rows(device_id=device_id, export_format=export_format, start=start, end=end)
+    if not compress:
+        async for chunk in chunks:
+            yield chunk
+        return
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        if compressed := compressor.compress(chunk):
+            yield compressed
+    yield compressor.flush()
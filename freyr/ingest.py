@@ -0,0 +1,333 @@
+__all__ = ["EXPIRED", "INGEST_QUEUE", "IngestQueue", "ingest_readings", "load_items"]
+
+import asyncio
+import contextlib
+import json
+import logging
+from collections import Counter
+from datetime import datetime
+from time import monotonic
+from typing import Any, Self
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import tuple_
+from sqlalchemy.exc import DataError, IntegrityError, OperationalError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from freyr.cache import mark_changed
+from freyr.constants import constants
+from freyr.database import engine, insert
+from freyr.events import publish
+from freyr.metrics import METRICS
+from freyr.models import (
+    BatchResult,
+    BatchStatus,
+    Compaction,
+    CompactionSource,
+    Conflict,
+    Device,
+    Reading,
+    ReadingCreate,
+)
+from freyr.retention import is_expired
+from freyr.rollups import refresh_rollups, update_rollups
+
+LOGGER = logging.getLogger(__name__)
+NDJSON = "application/x-ndjson"
+MAX_BATCH_SIZE = 10_000
+# Keeps each multi-row insert under SQLite's bound parameter limit.
+CHUNK_SIZE = 200
+EXPIRED = "timestamp: Older than the retention period"
+UNKNOWN_DEVICE = "device_id: Device not found"
+COMPACTED = "timestamp: Already compacted into the rollups, it can't be updated"
+RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 60.0
+
+
+def load_items(body: bytes, content_type: str) -> list[Any]:
+    if content_type.startswith(NDJSON):
+        items = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as err:
+                items.append(err)
+    else:
+        try:
+            items = json.loads(body)
+        except ValueError as err:
+            raise HTTPException(status_code=422, detail=f"Invalid JSON: {err}") from err
+        if not isinstance(items, list):
+            raise HTTPException(status_code=422, detail="Expected a JSON array of readings")
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413, detail=f"Batches are limited to {MAX_BATCH_SIZE} readings"
+        )
+    return items
+
+
+def _validate(item: Any, device_id: int | None = None) -> Reading | str:  # noqa: ANN401
+    if isinstance(item, ValueError):
+        return f"Invalid JSON: {item}"
+    try:
+        reading = ReadingCreate.model_validate(item)
+    except ValidationError as err:
+        details = []
+        for error in err.errors():
+            location = ".".join(str(x) for x in error["loc"])
+            details.append(f"{location}: {error['msg']}" if location else error["msg"])
+        return "; ".join(details)
+    if device_id is not None:
+        if reading.device_id is None:
+            reading.device_id = device_id
+        elif reading.device_id != device_id:
+            return "Body device_id doesn't match Path device_id"
+    if reading.device_id is None:
+        return "device_id: Field required"
+    if reading.timestamp is None:
+        reading.timestamp = datetime.fromisoformat(datetime.now().isoformat(timespec="seconds"))
+    elif is_expired(timestamp=reading.timestamp):
+        return EXPIRED
+    return Reading.model_validate(reading)
+
+
+async def _insert_chunk(
+    session: AsyncSession, readings: list[Reading], conflict: Conflict
+) -> tuple[dict[tuple[int, datetime], int], set[tuple[int, datetime]]]:
+    keys = [(x.device_id, x.timestamp) for x in readings]
+    existing = set()
+    if conflict == Conflict.UPDATE:
+        existing = set(
+            await session.exec(
+                select(Reading.device_id, Reading.timestamp).where(
+                    tuple_(Reading.device_id, Reading.timestamp).in_(keys)
+                )
+            )
+        )
+
+    statement = insert(Reading).values([x.model_dump(exclude={"id"}) for x in readings])
+    index_elements = [Reading.device_id, Reading.timestamp]
+    if conflict == Conflict.UPDATE:
+        statement = statement.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={
+                "temperature": statement.excluded.temperature,
+                "humidity": statement.excluded.humidity,
+            },
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=index_elements)
+    statement = statement.returning(Reading.id, Reading.device_id, Reading.timestamp)
+    ids = {
+        (device_id, timestamp): id_ for id_, device_id, timestamp in await session.exec(statement)
+    }
+    return ids, existing
+
+
+def _pending(
+    items: list[Any], results: list[BatchResult], conflict: Conflict, device_id: int | None
+) -> list[tuple[int, Reading]]:
+    pending: dict[tuple[int, datetime], tuple[int, Reading]] = {}
+    for index, item in enumerate(items):
+        reading = _validate(item=item, device_id=device_id)
+        if isinstance(reading, str):
+            results[index].detail = reading
+            continue
+        key = (reading.device_id, reading.timestamp)
+        if key in pending:
+            if conflict == Conflict.SKIP:
+                results[index].status = BatchStatus.DUPLICATE
+                results[index].detail = f"Duplicate of item {pending[key][0]}"
+                continue
+            previous = pending[key][0]
+            results[previous].status = BatchStatus.DUPLICATE
+            results[previous].detail = f"Replaced by item {index}"
+        pending[key] = (index, reading)
+    return list(pending.values())
+
+
+async def _insertable(
+    session: AsyncSession,
+    chunk: list[tuple[int, Reading]],
+    results: list[BatchResult],
+    compacted: datetime | None,
+) -> list[tuple[int, Reading]]:
+    device_ids = set(
+        await session.exec(select(Device.id).where(Device.id.in_({x.device_id for _, x in chunk})))
+    )
+    insertable = []
+    for index, reading in chunk:
+        if reading.device_id not in device_ids:
+            results[index].detail = UNKNOWN_DEVICE
+        elif compacted and reading.timestamp < compacted:
+            results[index].detail = COMPACTED
+        else:
+            insertable.append((index, reading))
+    return insertable
+
+
+async def ingest_readings(
+    session: AsyncSession,
+    items: list[Any],
+    conflict: Conflict = Conflict.SKIP,
+    device_id: int | None = None,
+) -> list[BatchResult]:
+    results = [BatchResult(index=x, status=BatchStatus.INVALID) for x in range(len(items))]
+    entries = _pending(items=items, results=results, conflict=conflict, device_id=device_id)
+    compacted = None
+    if conflict == Conflict.UPDATE and constants.settings.database.rollups:
+        # Updated hours are recalculated from their readings, which compacted hours no longer have.
+        watermark = await session.get(Compaction, CompactionSource.READINGS)
+        compacted = watermark.timestamp if watermark else None
+    created, updated = [], []
+    for start in range(0, len(entries), CHUNK_SIZE):
+        chunk = await _insertable(
+            session=session,
+            chunk=entries[start : start + CHUNK_SIZE],
+            results=results,
+            compacted=compacted,
+        )
+        if not chunk:
+            continue
+        ids, existing = await _insert_chunk(
+            session=session, readings=[x[1] for x in chunk], conflict=conflict
+        )
+        for index, reading in chunk:
+            key = (reading.device_id, reading.timestamp)
+            if key not in ids:
+                results[index].status = BatchStatus.DUPLICATE
+                results[index].detail = "Device Reading already exists"
+                continue
+            reading.id = results[index].id = ids[key]
+            if key in existing:
+                results[index].status = BatchStatus.UPDATED
+                updated.append(reading)
+            else:
+                results[index].status = BatchStatus.CREATED
+                created.append(reading)
+
+    mark_changed(session=session, device_ids={x.device_id for x in created + updated})
+    publish(session=session, readings=created + updated)
+    if constants.settings.database.rollups:
+        await update_rollups(session=session, readings=created)
+        await refresh_rollups(session=session, readings=updated)
+    return results
+
+
+class IngestQueue:
+    def __init__(self: Self, maxsize: int, batch_size: int, flush_interval: float) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue[ReadingCreate] = asyncio.Queue(maxsize=maxsize)
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self: Self) -> None:
+        # Created per start as events belong to the loop that first waits on them.
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="freyr-ingest")
+
+    async def stop(self: Self) -> None:
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    def put(self: Self, reading: ReadingCreate) -> bool:
+        try:
+            self._queue.put_nowait(reading)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def _get(self: Self, wait: float) -> ReadingCreate:
+        if self._stopping.is_set() or wait <= 0:
+            return self._queue.get_nowait()
+        # Stopping wakes the consumer instead of leaving shutdown waiting for the flush interval.
+        get = asyncio.ensure_future(self._queue.get())
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        done, _ = await asyncio.wait(
+            {get, stopping}, timeout=wait, return_when=asyncio.FIRST_COMPLETED
+        )
+        stopping.cancel()
+        if get in done:
+            return get.result()
+        get.cancel()
+        if stopping in done:
+            return self._queue.get_nowait()
+        raise TimeoutError
+
+    async def _collect(self: Self) -> list[ReadingCreate]:
+        try:
+            batch = [await self._get(wait=self.flush_interval)]
+        except (TimeoutError, asyncio.QueueEmpty):
+            return []
+        deadline = monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(await self._get(wait=deadline - monotonic()))
+            except (TimeoutError, asyncio.QueueEmpty):
+                break
+        return batch
+
+    async def _flush(self: Self, batch: list[ReadingCreate]) -> None:
+        delay = RETRY_DELAY
+        while True:
+            try:
+                results = await self._ingest(batch=batch)
+                break
+            except OperationalError:
+                # The database being unreachable or locked says nothing about the readings, so the
+                # batch waits for it instead of being dropped, only shutdown gives up on it.
+                if self._stopping.is_set():
+                    LOGGER.exception("Dropped %d queued readings while stopping", len(batch))
+                    METRICS.ingest_dropped.inc("error", amount=len(batch))
+                    return
+                LOGGER.warning(
+                    "Failed to flush %d queued readings, retrying in %ss", len(batch), delay
+                )
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+            except Exception as error:
+                if len(batch) == 1:
+                    LOGGER.exception("Dropped queued reading: %s", batch[0])
+                    invalid = isinstance(error, IntegrityError | DataError)
+                    METRICS.ingest_dropped.inc("invalid" if invalid else "error")
+                    return
+                # Retrying in halves narrows the failure down so only the readings causing it
+                # are lost.
+                LOGGER.warning("Failed to flush %d queued readings, retrying in halves", len(batch))
+                middle = len(batch) // 2
+                await self._flush(batch=batch[:middle])
+                await self._flush(batch=batch[middle:])
+                return
+        statuses = Counter(x.status for x in results)
+        LOGGER.debug("Flushed %d queued readings: %s", len(batch), dict(statuses))
+        for result in results:
+            if result.status == BatchStatus.INVALID:
+                LOGGER.warning("Dropped queued reading: %s", result.detail)
+                METRICS.ingest_dropped.inc("invalid")
+
+    async def _ingest(self: Self, batch: list[ReadingCreate]) -> list[BatchResult]:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            results = await ingest_readings(session=session, items=batch)
+            await session.commit()
+        return results
+
+    async def _run(self: Self) -> None:
+        while not self._stopping.is_set() or not self._queue.empty():
+            if batch := await self._collect():
+                await self._flush(batch=batch)
+
+
+INGEST_QUEUE = IngestQueue(
+    maxsize=constants.settings.ingest.queue_size,
+    batch_size=constants.settings.ingest.batch_size,
+    flush_interval=constants.settings.ingest.flush_interval,
+)
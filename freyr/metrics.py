@@ -0,0 +1,193 @@
+__all__ = ["METRICS", "Counter", "Gauge", "Histogram", "Metrics", "track_queries"]
+
+import math
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Self
+
+from sqlalchemy import Engine, event
+
+# The Prometheus client defaults, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+QUERY_START = "freyr.query_start"
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], **extra: str) -> str:
+    pairs = [*zip(names, values, strict=True), *extra.items()]
+    if not pairs:
+        return ""
+    escaped = (
+        (x, y.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for x, y in pairs
+    )
+    return "{" + ",".join(f'{x}="{y}"' for x, y in escaped) + "}"
+
+
+def _value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self: Self, name: str, description: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self: Self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self: Self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_labels(self.labels, labels)} {_value(value)}"
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(
+        self: Self, name: str, description: str, callback: Callable[[], float] | None = None
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.callback = callback
+        self.value = 0
+
+    def samples(self: Self) -> Iterator[str]:
+        yield f"{self.name} {_value(self.callback() if self.callback else self.value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self: Self,
+        name: str,
+        description: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = BUCKETS,
+    ) -> None:
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        # Per label set: a count for each bucket followed by the sum.
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self: Self, value: float, *labels: str) -> None:
+        if (entry := self._values.get(labels)) is None:
+            entry = self._values[labels] = [0] * len(self.buckets) + [0.0]
+        entry[bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def samples(self: Self) -> Iterator[str]:
+        for labels, entry in self._values.items():
+            total = 0
+            for bound, count in zip(self.buckets, entry, strict=False):
+                total += count
+                le = _labels(self.labels, labels, le=_value(bound))
+                yield f"{self.name}_bucket{le} {total}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {_value(entry[-1])}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {total}"
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self: Self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+class Metrics:
+    def __init__(self: Self) -> None:
+        self.requests = Counter(
+            name="freyr_http_requests_total",
+            description="HTTP requests by route and status.",
+            labels=("method", "route", "status"),
+        )
+        self.latency = Histogram(
+            name="freyr_http_request_duration_seconds",
+            description="HTTP request latency by route.",
+            labels=("method", "route"),
+        )
+        self.in_flight = Gauge(
+            name="freyr_http_requests_in_flight", description="HTTP requests being handled."
+        )
+        self.queries = Counter(
+            name="freyr_db_queries_total",
+            description="Database queries run while handling each route.",
+            labels=("route",),
+        )
+        self.query_time = Counter(
+            name="freyr_db_query_seconds_total",
+            description="Time spent in database queries while handling each route.",
+            labels=("route",),
+        )
+        self.checkout = Histogram(
+            name="freyr_db_pool_checkout_seconds",
+            description="Time taken to get a connection from the pool, including connecting.",
+        )
+        self.checked_out = Gauge(
+            name="freyr_db_pool_checked_out", description="Connections checked out of the pool."
+        )
+        self.ingest_dropped = Counter(
+            name="freyr_ingest_dropped_total",
+            description="Queued readings dropped instead of stored, by reason.",
+            labels=("reason",),
+        )
+
+    def instrument(self: Self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        # Disposing the engine replaces its pool, so it is looked up on each scrape.
+        self.checked_out.callback = lambda: engine.pool.checkedout()
+
+    def observe_request(
+        self: Self, method: str, route: str, status: int, seconds: float, stats: QueryStats
+    ) -> None:
+        self.requests.inc(method, route, str(status))
+        self.latency.observe(seconds, method, route)
+        self.queries.inc(route, amount=stats.count)
+        self.query_time.inc(route, amount=stats.seconds)
+
+    def render(self: Self) -> str:
+        lines = []
+        for metric in vars(self).values():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+def _before_cursor_execute(conn: Any, *args: Any) -> None:  # noqa: ANN401
+    conn.info.setdefault(QUERY_START, []).append(perf_counter())
+
+
+def _after_cursor_execute(conn: Any, *args: Any) -> None:  # noqa: ANN401
+    elapsed = perf_counter() - conn.info[QUERY_START].pop()
+    if (stats := _query_stats.get()) is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+METRICS = Metrics()
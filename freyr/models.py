@@ -1,7 +1,10 @@
 from datetime import datetime
 from decimal import Decimal
+from enum import Enum
 from typing import Annotated, Optional, Self
 
+from pydantic import field_validator
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -14,7 +17,8 @@ class Device(DeviceBase, table=True):
 
     id: int | None = Field(default=None, primary_key=True)
     readings: list["Reading"] = Relationship(
-        back_populates="device", sa_relationship_kwargs={"order_by": "Reading.timestamp.desc()"}
+        back_populates="device",
+        sa_relationship_kwargs={"order_by": "Reading.timestamp.desc()", "lazy": "raise"},
     )
 
     def __lt__(self: Self, other) -> int:  # noqa: ANN001
@@ -52,11 +56,17 @@ class ReadingBase(SQLModel):
 
 class Reading(ReadingBase, table=True):
     __tablename__ = "readings"
+    __table_args__ = (
+        Index("ix_readings_device_id_timestamp", "device_id", "timestamp", unique=True),
+        Index("ix_readings_timestamp_id", "timestamp", "id"),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
     timestamp: datetime
     device_id: int = Field(foreign_key="devices.id")
-    device: Device = Relationship(back_populates="readings")
+    device: Device = Relationship(
+        back_populates="readings", sa_relationship_kwargs={"lazy": "raise"}
+    )
 
     def __lt__(self: Self, other) -> int:  # noqa: ANN001
         if not isinstance(other, Reading):
@@ -76,12 +86,111 @@ class ReadingCreate(ReadingBase):
     device_id: int | None = None
     timestamp: datetime | None = None
 
+    @field_validator("timestamp")
+    @classmethod
+    def local_timestamp(cls: type[Self], value: datetime | None) -> datetime | None:
+        # Timestamps are stored without a timezone in server local time, as datetime.now() returns.
+        if value is None or value.tzinfo is None:
+            return value
+        return value.astimezone().replace(tzinfo=None)
+
 
 class ReadingPublic(ReadingBase):
     id: int
     timestamp: datetime
 
 
+class ReadingEvent(ReadingPublic):
+    device_id: int
+
+
+class Conflict(str, Enum):
+    SKIP = "SKIP"
+    UPDATE = "UPDATE"
+
+
+class BatchStatus(str, Enum):
+    CREATED = "CREATED"
+    UPDATED = "UPDATED"
+    DUPLICATE = "DUPLICATE"
+    INVALID = "INVALID"
+
+
+class BatchResult(SQLModel):
+    index: int
+    status: BatchStatus
+    id: int | None = None
+    detail: str | None = None
+
+
+class CacheStats(SQLModel):
+    size: int
+    maxsize: int
+    ttl: float
+    hits: int
+    misses: int
+
+
+class ExportFormat(str, Enum):
+    CSV = "CSV"
+    NDJSON = "NDJSON"
+
+    @classmethod
+    def _missing_(cls: type[Self], value: object) -> Self | None:
+        # Query strings are conventionally lowercase, so ?format=csv is accepted as well.
+        return cls.__members__.get(value.upper()) if isinstance(value, str) else None
+
+
+class Timeframe(str, Enum):
+    HOURLY = "HOURLY"
+    DAILY = "DAILY"
+    MONTHLY = "MONTHLY"
+    YEARLY = "YEARLY"
+
+
+class Rollup(SQLModel, table=True):
+    __tablename__ = "rollups"
+
+    device_id: int = Field(foreign_key="devices.id", primary_key=True)
+    timeframe: Timeframe = Field(primary_key=True)
+    timestamp: datetime = Field(primary_key=True)
+    temperature_min: Decimal | None = None
+    temperature_max: Decimal | None = None
+    temperature_sum: Decimal = Decimal(0)
+    temperature_count: int = 0
+    humidity_min: Decimal | None = None
+    humidity_max: Decimal | None = None
+    humidity_sum: Decimal = Decimal(0)
+    humidity_count: int = 0
+
+
+class CompactionSource(str, Enum):
+    READINGS = "READINGS"
+    HOURLY = "HOURLY"
+
+
+class Compaction(SQLModel, table=True):
+    __tablename__ = "compactions"
+
+    # Everything from the source before the timestamp has been removed.
+    source: CompactionSource = Field(primary_key=True)
+    timestamp: datetime
+
+
+class Lease(SQLModel, table=True):
+    __tablename__ = "leases"
+
+    name: str = Field(primary_key=True)
+    owner: str
+    expires: datetime
+
+
+class RetentionReport(SQLModel):
+    readings: int = 0
+    rollups: int = 0
+    bytes: int | None = None
+
+
 class Summary(SQLModel):
     class Reading(SQLModel):
         timestamp: datetime
@@ -104,3 +213,10 @@ def __hash__(self: Self) -> int:
     highs: list[Reading] = Field(default_factory=list)
     averages: list[Reading] = Field(default_factory=list)
     lows: list[Reading] = Field(default_factory=list)
+
+
+class Summaries(SQLModel):
+    yearly: Summary | None = None
+    monthly: Summary | None = None
+    daily: Summary | None = None
+    hourly: Summary | None = None
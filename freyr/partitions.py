@@ -0,0 +1,144 @@
+__all__ = [
+    "Partition",
+    "create_partitioned_table",
+    "drop_partition",
+    "ensure_partitions",
+    "is_partitioned",
+    "list_partitions",
+]
+
+import logging
+import re
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy import Connection, inspect, text
+from sqlalchemy.schema import CreateColumn
+
+from freyr.constants import constants
+from freyr.models import Reading
+from freyr.queries import period
+from freyr.settings import Source
+from freyr.utils import month_grouping
+
+LOGGER = logging.getLogger(__name__)
+TABLE = Reading.__table__
+DEFAULT = f"{TABLE.name}_default"
+PATTERN = re.compile(rf"^{TABLE.name}_(\d{{4}})_(\d{{2}})$")
+
+
+class Partition(NamedTuple):
+    name: str
+    start: datetime
+    end: datetime
+
+
+def _partition(month: datetime) -> Partition:
+    start, end = period(year=month.year, month=month.month)
+    return Partition(name=f"{TABLE.name}_{start:%Y_%m}", start=start, end=end)
+
+
+def is_partitioned(connection: Connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(
+        connection.execute(
+            text("SELECT count(*) FROM pg_partitioned_table WHERE partrelid = to_regclass(:name)"),
+            {"name": TABLE.name},
+        ).scalar_one()
+    )
+
+
+def create_partitioned_table(connection: Connection) -> None:
+    if constants.settings.database.source != Source.POSTGRES:
+        LOGGER.warning("Partitioning is only supported on Postgres, ignoring database.partitioned")
+        return
+    if inspect(connection).has_table(TABLE.name):
+        if not is_partitioned(connection):
+            LOGGER.warning(
+                "The %s table was created before partitioning was enabled and stays unpartitioned",
+                TABLE.name,
+            )
+        return
+    for key in TABLE.foreign_keys:
+        key.column.table.create(connection, checkfirst=True)
+    # Postgres requires the partition key in every unique constraint, including the primary key.
+    definitions = [str(CreateColumn(x).compile(dialect=connection.dialect)) for x in TABLE.columns]
+    definitions.append(f"PRIMARY KEY ({', '.join(x.name for x in TABLE.primary_key)}, timestamp)")
+    definitions.extend(
+        f"FOREIGN KEY ({x.parent.name}) REFERENCES {x.column.table.name} ({x.column.name})"
+        for x in TABLE.foreign_keys
+    )
+    connection.exec_driver_sql(
+        f"CREATE TABLE {TABLE.name} ({', '.join(definitions)}) PARTITION BY RANGE (timestamp)"
+    )
+    # Readings without a monthly partition land here until ensure_partitions moves them.
+    connection.exec_driver_sql(f"CREATE TABLE {DEFAULT} PARTITION OF {TABLE.name} DEFAULT")
+    LOGGER.info("Created the partitioned %s table", TABLE.name)
+
+
+def list_partitions(connection: Connection) -> list[Partition]:
+    if not is_partitioned(connection):
+        return []
+    names = connection.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits"
+            " JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid"
+            " WHERE pg_inherits.inhparent = to_regclass(:name)"
+        ),
+        {"name": TABLE.name},
+    ).scalars()
+    matches = [x for x in map(PATTERN.match, names) if x]
+    partitions = [_partition(datetime(int(x[1]), int(x[2]), 1)) for x in matches]
+    return sorted(partitions, key=lambda x: x.start)
+
+
+def _attach(connection: Connection, partition: Partition) -> None:
+    connection.exec_driver_sql(
+        f"CREATE TABLE {partition.name}"
+        f" (LIKE {TABLE.name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    )
+    # Rows for the month are moved out of the default partition, otherwise attaching fails.
+    connection.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT}"  # noqa: S608
+            " WHERE timestamp >= :start AND timestamp < :end RETURNING *)"
+            f" INSERT INTO {partition.name} SELECT * FROM moved"
+        ),
+        {"start": partition.start, "end": partition.end},
+    )
+    connection.exec_driver_sql(
+        f"ALTER TABLE {TABLE.name} ATTACH PARTITION {partition.name}"
+        f" FOR VALUES FROM ('{partition.start.isoformat()}') TO ('{partition.end.isoformat()}')"
+    )
+    LOGGER.info("Created partition %s", partition.name)
+
+
+def ensure_partitions(connection: Connection, now: datetime | None = None) -> list[Partition]:
+    if not is_partitioned(connection):
+        return []
+    months = set(
+        connection.execute(
+            text(f"SELECT DISTINCT date_trunc('month', timestamp) FROM {DEFAULT}")  # noqa: S608
+        ).scalars()
+    )
+    month = month_grouping(now or datetime.now())
+    for _ in range(constants.settings.database.partitions_ahead + 1):
+        months.add(month)
+        month = _partition(month).end
+    existing = {x.start for x in list_partitions(connection)}
+    created = []
+    for month in sorted(months - existing):
+        partition = _partition(month)
+        _attach(connection=connection, partition=partition)
+        created.append(partition)
+    return created
+
+
+def drop_partition(connection: Connection, partition: Partition) -> int:
+    count = connection.execute(
+        text(f"SELECT count(*) FROM {partition.name}")  # noqa: S608
+    ).scalar_one()
+    connection.exec_driver_sql(f"DROP TABLE {partition.name}")
+    LOGGER.info("Dropped partition %s with %d readings", partition.name, count)
+    return count
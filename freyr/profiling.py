@@ -0,0 +1,119 @@
+__all__ = ["RequestProfile", "instrument", "profile_queries"]
+
+import logging
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Self
+
+from sqlalchemy import Connection, Engine, event
+
+from freyr.constants import constants
+
+LOGGER = logging.getLogger(__name__)
+PROFILE_START = "freyr.profile_start"
+EXPLAIN = {"postgresql": "EXPLAIN", "sqlite": "EXPLAIN QUERY PLAN"}
+
+
+class RequestProfile:
+    __slots__ = ("statements",)
+
+    def __init__(self: Self) -> None:
+        # Statement text: [count, seconds]
+        self.statements: dict[str, list[float]] = {}
+
+    @property
+    def count(self: Self) -> int:
+        return sum(x[0] for x in self.statements.values())
+
+    @property
+    def seconds(self: Self) -> float:
+        return sum(x[1] for x in self.statements.values())
+
+    def add(self: Self, statement: str, seconds: float) -> None:
+        if (entry := self.statements.get(statement)) is None:
+            entry = self.statements[statement] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+
+    def repeated(self: Self, threshold: int) -> list[tuple[str, int]]:
+        return [(x, int(y[0])) for x, y in self.statements.items() if y[0] >= threshold]
+
+    def server_timing(self: Self, total: float) -> str:
+        database = self.seconds
+        return (
+            f'db;dur={database * 1000:.1f};desc="{self.count} queries", '
+            f"app;dur={max(total - database, 0) * 1000:.1f}"
+        )
+
+    def report(self: Self, request: str) -> None:
+        for statement, count in self.repeated(
+            threshold=constants.settings.performance.repeated_queries
+        ):
+            LOGGER.warning(
+                "%s ran the same statement %d times, likely an N+1 query: %s",
+                request,
+                count,
+                statement,
+            )
+
+
+_profile: ContextVar[RequestProfile | None] = ContextVar("request_profile", default=None)
+
+
+def _explain(conn: Connection, statement: str, parameters: Any) -> str:  # noqa: ANN401
+    # Run on the driver connection so the plan isn't counted as one of the request's queries.
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"{EXPLAIN[conn.dialect.name]} {statement}", parameters)
+        return "\n".join(" ".join(str(x) for x in row) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn: Connection, *args: Any) -> None:
+    if _profile.get() is not None:
+        conn.info.setdefault(PROFILE_START, []).append(perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Connection,
+    cursor: Any,  # noqa: ANN401, ARG001
+    statement: str,
+    parameters: Any,  # noqa: ANN401
+    context: Any,  # noqa: ANN401, ARG001
+    executemany: bool,
+) -> None:
+    if (profile := _profile.get()) is None or not conn.info.get(PROFILE_START):
+        return
+    elapsed = perf_counter() - conn.info[PROFILE_START].pop()
+    profile.add(statement=statement, seconds=elapsed)
+    if elapsed < constants.settings.performance.slow_query:
+        return
+    plan = "Not available"
+    # Only reads are explained, a failed EXPLAIN would abort the transaction on Postgres.
+    if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        try:
+            plan = _explain(conn=conn, statement=statement, parameters=parameters)
+        except Exception:
+            LOGGER.debug("Unable to explain: %s", statement, exc_info=True)
+    LOGGER.warning("Slow query took %.3fs: %s\n%s", elapsed, statement, plan)
+
+
+def instrument(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def profile_queries() -> Iterator[RequestProfile | None]:
+    if not constants.settings.performance.profiling:
+        yield None
+        return
+    profile = RequestProfile()
+    token = _profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
@@ -0,0 +1,247 @@
+__all__ = [
+    "decode_cursor",
+    "encode_cursor",
+    "get_calendar",
+    "get_latest_readings",
+    "period",
+    "range_filters",
+    "summarize_readings",
+    "timestamp_filters",
+    "truncate",
+]
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, ClassVar
+
+from sqlalchemy import ColumnElement, DateTime, extract, false, func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from freyr.models import Device, Reading, Rollup, Summary, Timeframe
+
+SQLITE_FORMATS = {
+    Timeframe.HOURLY: "%Y-%m-%d %H:00:00.000000",
+    Timeframe.DAILY: "%Y-%m-%d 00:00:00.000000",
+    Timeframe.MONTHLY: "%Y-%m-01 00:00:00.000000",
+    Timeframe.YEARLY: "%Y-01-01 00:00:00.000000",
+}
+POSTGRES_FIELDS = {
+    Timeframe.HOURLY: "hour",
+    Timeframe.DAILY: "day",
+    Timeframe.MONTHLY: "month",
+    Timeframe.YEARLY: "year",
+}
+
+
+class truncate(FunctionElement):  # noqa: N801
+    type = DateTime()
+    inherit_cache = True
+    _traverse_internals: ClassVar = [
+        *FunctionElement._traverse_internals,  # noqa: SLF001
+        ("timeframe", InternalTraversal.dp_string),
+    ]
+
+    def __init__(self, column: ColumnElement, timeframe: Timeframe) -> None:
+        self.timeframe = timeframe
+        super().__init__(column)
+
+
+@compiles(truncate, "sqlite")
+def _truncate_sqlite(element: truncate, compiler: SQLCompiler, **kwargs: Any) -> str:
+    return "strftime('%s', %s)" % (  # noqa: UP031
+        SQLITE_FORMATS[element.timeframe],
+        compiler.process(element.clauses, **kwargs),
+    )
+
+
+@compiles(truncate, "postgresql")
+def _truncate_postgres(element: truncate, compiler: SQLCompiler, **kwargs: Any) -> str:
+    return "date_trunc('%s', %s)" % (  # noqa: UP031
+        POSTGRES_FIELDS[element.timeframe],
+        compiler.process(element.clauses, **kwargs),
+    )
+
+
+def period(
+    year: int, month: int | None = None, day: int | None = None
+) -> tuple[datetime, datetime]:
+    if month and day:
+        start = datetime(year, month, day)
+        return start, start + timedelta(days=1)
+    if month:
+        return datetime(year, month, 1), datetime(year + month // 12, month % 12 + 1, 1)
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+
+def range_filters(
+    column: ColumnElement, start: datetime | None = None, end: datetime | None = None
+) -> list[ColumnElement]:
+    filters = []
+    if start:
+        filters.append(column >= start)
+    if end:
+        filters.append(column < end)
+    return filters
+
+
+def timestamp_filters(
+    column: ColumnElement, year: int | None = None, month: int | None = None, day: int | None = None
+) -> list[ColumnElement]:
+    if not year:
+        filters = []
+        if month:
+            filters.append(extract("month", column) == month)
+        if day:
+            filters.append(extract("day", column) == day)
+        return filters
+    try:
+        start, end = period(year=year, month=month, day=day)
+    except (ValueError, OverflowError):
+        return [false()]
+    filters = [column >= start, column < end]
+    if day and not month:
+        filters.append(extract("day", column) == day)
+    return filters
+
+
+def _hundredths(column: ColumnElement) -> ColumnElement:
+    # SQLite sums floats, whole hundredths keep the total exact so averages round as in utils.
+    return func.sum(func.round(column * 100))
+
+
+def _average(hundredths: Decimal | float | None, count: int) -> Decimal | None:
+    return round(Decimal(int(hundredths)) / 100 / count, 2) if count else None
+
+
+async def summarize_readings(
+    session: AsyncSession,
+    device_id: int,
+    timeframe: Timeframe,
+    year: int | None = None,
+    month: int | None = None,
+    day: int | None = None,
+    offset: int = 0,
+    limit: int = 100,
+) -> Summary:
+    bucket = truncate(Reading.timestamp, timeframe).label("bucket")
+    query = (
+        select(
+            bucket,
+            func.max(Reading.temperature),
+            _hundredths(Reading.temperature),
+            func.count(Reading.temperature),
+            func.min(Reading.temperature),
+            func.max(Reading.humidity),
+            _hundredths(Reading.humidity),
+            func.count(Reading.humidity),
+            func.min(Reading.humidity),
+        )
+        .where(Reading.device_id == device_id)
+        .where(*timestamp_filters(column=Reading.timestamp, year=year, month=month, day=day))
+        .group_by(bucket)
+        .order_by(bucket)
+        .offset(offset)
+        .limit(limit)
+    )
+    summary = Summary()
+    for (
+        timestamp,
+        high_temp,
+        temp_total,
+        temp_count,
+        low_temp,
+        high_hum,
+        hum_total,
+        hum_count,
+        low_hum,
+    ) in await session.exec(query):
+        summary.highs.append(
+            Summary.Reading(timestamp=timestamp, temperature=high_temp, humidity=high_hum)
+        )
+        summary.averages.append(
+            Summary.Reading(
+                timestamp=timestamp,
+                temperature=_average(hundredths=temp_total, count=temp_count),
+                humidity=_average(hundredths=hum_total, count=hum_count),
+            )
+        )
+        summary.lows.append(
+            Summary.Reading(timestamp=timestamp, temperature=low_temp, humidity=low_hum)
+        )
+    return summary
+
+
+async def get_latest_readings(session: AsyncSession, device_ids: list[int]) -> dict[int, Reading]:
+    if not device_ids:
+        return {}
+    other = aliased(Reading)
+    # Correlating with devices looks up each device's newest timestamp once from the index,
+    # correlating with readings would repeat it for every reading the device has.
+    latest = (
+        select(func.max(other.timestamp))
+        .where(other.device_id == Device.id)
+        .correlate(Device)
+        .scalar_subquery()
+    )
+    query = (
+        select(Reading)
+        .join(Device, Reading.device_id == Device.id)
+        .where(Device.id.in_(device_ids), Reading.timestamp == latest)
+    )
+    return {x.device_id: x for x in await session.exec(query)}
+
+
+CALENDAR_LEVELS = {"years": Timeframe.YEARLY, "months": Timeframe.MONTHLY, "days": Timeframe.DAILY}
+
+
+async def get_calendar(
+    session: AsyncSession,
+    device_id: int,
+    year: int | None = None,
+    month: int | None = None,
+    rollups: bool = True,
+) -> dict[str, list[int]]:
+    calendar = {"years": [], "months": [], "days": []}
+    filters = {"years": {}, "months": {"year": year}, "days": {"year": year, "month": month}}
+    for name, timeframe in CALENDAR_LEVELS.items():
+        if not all(filters[name].values()):
+            continue
+        if rollups:
+            # Every period with readings has a rollup, so these are small primary key scans.
+            bucket = Rollup.timestamp
+            query = select(bucket).where(
+                Rollup.device_id == device_id,
+                Rollup.timeframe == timeframe,
+                *timestamp_filters(column=Rollup.timestamp, **filters[name]),
+            )
+        else:
+            bucket = truncate(Reading.timestamp, timeframe)
+            query = (
+                select(bucket)
+                .distinct()
+                .where(
+                    Reading.device_id == device_id,
+                    *timestamp_filters(column=Reading.timestamp, **filters[name]),
+                )
+            )
+        field = name.removesuffix("s")
+        calendar[name] = [getattr(x, field) for x in await session.exec(query.order_by(bucket))]
+    return calendar
+
+
+def encode_cursor(reading: Reading) -> str:
+    value = f"{reading.timestamp.isoformat()}|{reading.id}"
+    return urlsafe_b64encode(value.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    value = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    timestamp, _, id_ = value.partition("|")
+    return datetime.fromisoformat(timestamp), int(id_)
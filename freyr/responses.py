@@ -1,11 +1,67 @@
-__all__ = ["ErrorResponse"]
+__all__ = ["COLUMNS", "ErrorResponse", "pack_column_frames", "pack_columns"]
 
-from datetime import datetime
+import struct
+import sys
+from array import array
+from datetime import UTC, datetime
 
 from pydantic import BaseModel
 
+from freyr.models import Summary
+
+COLUMNS = "application/x-freyr-columns"
+MAGIC = b"FRC1"
+
 
 class ErrorResponse(BaseModel):
     timestamp: datetime
     status: str
     reason: str
+
+
+def pack_columns(summary: Summary) -> bytes:
+    # Little-endian layout, every column starts aligned to its element size:
+    #   magic (4 bytes), count (uint32)
+    #   timestamps (int64[count], seconds since epoch)
+    #   temperature high, avg, low then humidity high, avg, low (float32[count] each)
+    #   validity bitmaps for the 6 float columns (ceil(count / 8) bytes each, LSB first)
+    count = len(summary.highs)
+    timestamps = array(
+        "q", (int(x.timestamp.replace(tzinfo=UTC).timestamp()) for x in summary.highs)
+    )
+    values, bitmaps = [], []
+    for field in ("temperature", "humidity"):
+        for readings in (summary.highs, summary.averages, summary.lows):
+            column = array("f", bytes(4 * count))
+            bitmap = bytearray((count + 7) // 8)
+            for index, reading in enumerate(readings):
+                value = getattr(reading, field)
+                if value is None:
+                    column[index] = float("nan")
+                    continue
+                column[index] = float(value)
+                bitmap[index >> 3] |= 1 << (index & 7)
+            values.append(column)
+            bitmaps.append(bytes(bitmap))
+    if sys.byteorder == "big":
+        for column in (timestamps, *values):
+            column.byteswap()
+    return b"".join(
+        (
+            MAGIC,
+            struct.pack("<I", count),
+            timestamps.tobytes(),
+            *(x.tobytes() for x in values),
+            *bitmaps,
+        )
+    )
+
+
+def pack_column_frames(summaries: list[Summary]) -> bytes:
+    # Packed summaries back to back, each zero padded to a multiple of 8 bytes so the next
+    # summary's timestamps stay aligned.
+    frames = []
+    for summary in summaries:
+        frame = pack_columns(summary=summary)
+        frames.append(frame + bytes(-len(frame) % 8))
+    return b"".join(frames)
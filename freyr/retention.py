@@ -0,0 +1,220 @@
+__all__ = ["RETENTION_TASK", "compact", "is_expired", "readings_cutoff"]
+
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from freyr.cache import mark_changed
+from freyr.constants import constants
+from freyr.database import acquire_lease, engine, insert
+from freyr.models import Compaction, CompactionSource, Reading, RetentionReport, Rollup, Timeframe
+from freyr.partitions import drop_partition, list_partitions
+from freyr.rollups import refresh_period
+from freyr.settings import Source
+from freyr.tasks import PeriodicTask
+from freyr.utils import day_grouping, hour_grouping, month_grouping
+
+LOGGER = logging.getLogger(__name__)
+# PRAGMA auto_vacuum value for INCREMENTAL
+INCREMENTAL = 2
+
+
+def readings_cutoff(now: datetime | None = None) -> datetime | None:
+    days = constants.settings.retention.readings_days
+    if not constants.settings.retention.enabled or days <= 0:
+        return None
+    return hour_grouping((now or datetime.now()) - timedelta(days=days))
+
+
+def is_expired(timestamp: datetime) -> bool:
+    cutoff = readings_cutoff()
+    return cutoff is not None and timestamp < cutoff
+
+
+def _hourly_cutoff(watermark: datetime | None, now: datetime) -> datetime | None:
+    days = constants.settings.retention.hourly_days
+    if watermark is None or days <= 0:
+        return None
+    # Daily rollups are refreshed from the hourly ones, so whole days of hourly rollups must
+    # remain for every day that still has readings.
+    return min(day_grouping(now - timedelta(days=days)), day_grouping(watermark))
+
+
+async def _watermark(session: AsyncSession, source: CompactionSource) -> datetime | None:
+    compaction = await session.get(Compaction, source)
+    return compaction.timestamp if compaction else None
+
+
+async def _set_watermark(
+    session: AsyncSession, source: CompactionSource, timestamp: datetime
+) -> None:
+    statement = insert(Compaction).values(source=source, timestamp=timestamp)
+    statement = statement.on_conflict_do_update(
+        index_elements=[Compaction.source], set_={"timestamp": statement.excluded.timestamp}
+    )
+    await session.exec(statement)
+
+
+async def _next_chunk(session: AsyncSession, cutoff: datetime) -> tuple[datetime, datetime] | None:
+    first = (
+        await session.exec(select(func.min(Reading.timestamp)).where(Reading.timestamp < cutoff))
+    ).one()
+    if first is None:
+        return None
+    start = hour_grouping(first)
+    boundary = (
+        await session.exec(
+            select(Reading.timestamp)
+            .where(Reading.timestamp < cutoff)
+            .order_by(Reading.timestamp)
+            .offset(constants.settings.retention.chunk_size)
+            .limit(1)
+        )
+    ).one_or_none()
+    end = hour_grouping(boundary) if boundary else cutoff
+    # Chunks cover whole hours so each hourly rollup is folded from all of its readings at once.
+    if end <= start:
+        end = start + timedelta(hours=1)
+    return start, min(end, cutoff)
+
+
+async def _mark_compacted(session: AsyncSession, start: datetime, end: datetime) -> None:
+    # Monthly rollups are never pruned, so they list every device with readings in the period.
+    device_ids = await session.exec(
+        select(Rollup.device_id)
+        .distinct()
+        .where(
+            Rollup.timeframe == Timeframe.MONTHLY,
+            Rollup.timestamp >= month_grouping(start),
+            Rollup.timestamp < end,
+        )
+    )
+    mark_changed(session=session, device_ids=set(device_ids))
+
+
+async def _drop_partitions(cutoff: datetime) -> int:
+    async with engine.connect() as connection:
+        partitions = await connection.run_sync(list_partitions)
+    removed = 0
+    for partition in partitions:
+        if partition.end > cutoff:
+            break
+        async with AsyncSession(engine) as session:
+            watermark = await _watermark(session=session, source=CompactionSource.READINGS)
+            # Readings from the default partition may still precede the monthly partition.
+            first = (await session.exec(select(func.min(Reading.timestamp)))).one()
+            if watermark is None or watermark < partition.end:
+                start = max(hour_grouping(first or partition.start), watermark or partition.start)
+                await refresh_period(session=session, start=start, end=partition.end)
+            await _mark_compacted(
+                session=session, start=first or partition.start, end=partition.end
+            )
+            connection = await session.connection()
+            removed += await connection.run_sync(drop_partition, partition)
+            result = await session.exec(delete(Reading).where(Reading.timestamp < partition.end))
+            removed += result.rowcount
+            await _set_watermark(
+                session=session,
+                source=CompactionSource.READINGS,
+                timestamp=max(partition.end, watermark or partition.end),
+            )
+            await session.commit()
+    return removed
+
+
+async def _compact_readings(cutoff: datetime) -> int:
+    # Whole months are dropped with their partition instead of deleting each reading.
+    removed = await _drop_partitions(cutoff=cutoff)
+    while True:
+        async with AsyncSession(engine) as session:
+            chunk = await _next_chunk(session=session, cutoff=cutoff)
+            if chunk is None:
+                return removed
+            start, end = chunk
+            watermark = await _watermark(session=session, source=CompactionSource.READINGS)
+            # Hours before the watermark were already folded, readings that arrived late for
+            # them were merged into the rollups on insert.
+            if watermark is None or watermark < end:
+                await refresh_period(session=session, start=max(start, watermark or start), end=end)
+            await _mark_compacted(session=session, start=start, end=end)
+            result = await session.exec(delete(Reading).where(Reading.timestamp < end))
+            await _set_watermark(
+                session=session,
+                source=CompactionSource.READINGS,
+                timestamp=max(end, watermark or end),
+            )
+            await session.commit()
+        removed += result.rowcount
+        LOGGER.debug("Compacted %d readings before %s", result.rowcount, end)
+
+
+async def _prune_hourly(now: datetime) -> int:
+    async with AsyncSession(engine) as session:
+        watermark = await _watermark(session=session, source=CompactionSource.READINGS)
+        cutoff = _hourly_cutoff(watermark=watermark, now=now)
+        if cutoff is None:
+            return 0
+        device_ids = (
+            await session.exec(
+                delete(Rollup)
+                .where(Rollup.timeframe == Timeframe.HOURLY, Rollup.timestamp < cutoff)
+                .returning(Rollup.device_id)
+            )
+        ).all()
+        mark_changed(session=session, device_ids=set(device_ids))
+        await _set_watermark(session=session, source=CompactionSource.HOURLY, timestamp=cutoff)
+        await session.commit()
+    return len(device_ids)
+
+
+async def _vacuum() -> int | None:
+    if constants.settings.database.source != Source.SQLITE:
+        # Postgres marks the space as reusable through autovacuum.
+        return None
+    async with engine.connect() as connection:
+        autocommit = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        page_size = (await autocommit.execute(text("PRAGMA page_size"))).scalar_one()
+        before = (await autocommit.execute(text("PRAGMA page_count"))).scalar_one()
+        if (await autocommit.execute(text("PRAGMA auto_vacuum"))).scalar_one() != INCREMENTAL:
+            LOGGER.info("Switching the database to incremental vacuuming, this runs a full VACUUM")
+            await autocommit.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+            await autocommit.execute(text("VACUUM"))
+        else:
+            await autocommit.execute(text("PRAGMA incremental_vacuum"))
+        after = (await autocommit.execute(text("PRAGMA page_count"))).scalar_one()
+    return (before - after) * page_size
+
+
+async def compact(now: datetime | None = None) -> RetentionReport:
+    report = RetentionReport()
+    if not constants.settings.retention.enabled:
+        LOGGER.warning("Retention is disabled, set retention.enabled to compact the readings")
+        return report
+    if not constants.settings.database.rollups:
+        LOGGER.warning("Retention needs database.rollups enabled, skipping compaction")
+        return report
+    now = now or datetime.now()
+    cutoff = readings_cutoff(now=now)
+    if cutoff is not None:
+        report.readings = await _compact_readings(cutoff=cutoff)
+    report.rollups = await _prune_hourly(now=now)
+    if report.readings or report.rollups:
+        report.bytes = await _vacuum()
+    LOGGER.info(
+        "Retention removed %d readings and %d hourly rollups, reclaiming %s bytes",
+        report.readings,
+        report.rollups,
+        "an unknown number of" if report.bytes is None else f"{report.bytes:,}",
+    )
+    return report
+
+
+RETENTION_TASK = PeriodicTask(
+    name="freyr-retention",
+    interval=constants.settings.retention.interval,
+    job=compact,
+    lease=acquire_lease,
+)
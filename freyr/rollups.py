@@ -0,0 +1,371 @@
+__all__ = [
+    "rebuild_rollups",
+    "refresh_period",
+    "refresh_rollups",
+    "summarize_reading_timeframes",
+    "summarize_rollup_timeframes",
+    "summarize_rollups",
+    "update_rollups",
+]
+
+from collections.abc import Callable, Iterable
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import ColumnElement, Select, and_, case, delete, func, literal, or_
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from freyr.cache import mark_changed
+from freyr.database import insert
+from freyr.models import Compaction, CompactionSource, Device, Reading, Rollup, Summary, Timeframe
+from freyr.queries import period, timestamp_filters, truncate
+from freyr.utils import (
+    ReadingColumns,
+    day_grouping,
+    hour_grouping,
+    month_grouping,
+    summarize,
+    year_grouping,
+)
+
+GROUPINGS: dict[Timeframe, Callable[[datetime], datetime]] = {
+    Timeframe.HOURLY: hour_grouping,
+    Timeframe.DAILY: day_grouping,
+    Timeframe.MONTHLY: month_grouping,
+    Timeframe.YEARLY: year_grouping,
+}
+
+
+COLUMNS = [
+    "device_id",
+    "timeframe",
+    "timestamp",
+    "temperature_min",
+    "temperature_max",
+    "temperature_sum",
+    "temperature_count",
+    "humidity_min",
+    "humidity_max",
+    "humidity_sum",
+    "humidity_count",
+]
+# Keeps each multi-row upsert under SQLite's bound parameter limit, the lowest of the databases.
+CHUNK_SIZE = 32_766 // len(COLUMNS)
+# Each timeframe is aggregated from the next finer one, hourly rollups come from the readings.
+SOURCES = {
+    Timeframe.DAILY: Timeframe.HOURLY,
+    Timeframe.MONTHLY: Timeframe.DAILY,
+    Timeframe.YEARLY: Timeframe.MONTHLY,
+}
+
+
+def _least(current: ColumnElement, new: ColumnElement) -> ColumnElement:
+    return case((current.is_(None), new), (new < current, new), else_=current)
+
+
+def _greatest(current: ColumnElement, new: ColumnElement) -> ColumnElement:
+    return case((current.is_(None), new), (new > current, new), else_=current)
+
+
+def _merge(rollup: Rollup, temperature: Decimal | None, humidity: Decimal | None) -> None:
+    if temperature is not None:
+        if rollup.temperature_count == 0:
+            rollup.temperature_min = rollup.temperature_max = temperature
+        rollup.temperature_min = min(rollup.temperature_min, temperature)
+        rollup.temperature_max = max(rollup.temperature_max, temperature)
+        rollup.temperature_sum += temperature
+        rollup.temperature_count += 1
+    if humidity is not None:
+        if rollup.humidity_count == 0:
+            rollup.humidity_min = rollup.humidity_max = humidity
+        rollup.humidity_min = min(rollup.humidity_min, humidity)
+        rollup.humidity_max = max(rollup.humidity_max, humidity)
+        rollup.humidity_sum += humidity
+        rollup.humidity_count += 1
+
+
+async def update_rollups(session: AsyncSession, readings: list[Reading]) -> None:
+    buckets: dict[tuple[int, Timeframe, datetime], Rollup] = {}
+    for reading in readings:
+        for timeframe, grouping in GROUPINGS.items():
+            key = (reading.device_id, timeframe, grouping(reading.timestamp))
+            if (rollup := buckets.get(key)) is None:
+                rollup = buckets[key] = Rollup(device_id=key[0], timeframe=key[1], timestamp=key[2])
+            _merge(rollup=rollup, temperature=reading.temperature, humidity=reading.humidity)
+    if not buckets:
+        return
+
+    values = [x.model_dump() for x in buckets.values()]
+    for start in range(0, len(values), CHUNK_SIZE):
+        statement = insert(Rollup).values(values[start : start + CHUNK_SIZE])
+        excluded = statement.excluded
+        statement = statement.on_conflict_do_update(
+            index_elements=[Rollup.device_id, Rollup.timeframe, Rollup.timestamp],
+            set_={
+                "temperature_min": _least(Rollup.temperature_min, excluded.temperature_min),
+                "temperature_max": _greatest(Rollup.temperature_max, excluded.temperature_max),
+                "temperature_sum": Rollup.temperature_sum + excluded.temperature_sum,
+                "temperature_count": Rollup.temperature_count + excluded.temperature_count,
+                "humidity_min": _least(Rollup.humidity_min, excluded.humidity_min),
+                "humidity_max": _greatest(Rollup.humidity_max, excluded.humidity_max),
+                "humidity_sum": Rollup.humidity_sum + excluded.humidity_sum,
+                "humidity_count": Rollup.humidity_count + excluded.humidity_count,
+            },
+        )
+        await session.exec(statement)
+
+
+def _aggregate(timeframe: Timeframe) -> tuple[Select, ColumnElement, ColumnElement]:
+    label = literal(timeframe, type_=Rollup.__table__.c.timeframe.type)
+    if timeframe == Timeframe.HOURLY:
+        bucket = truncate(Reading.timestamp, timeframe)
+        query = select(
+            Reading.device_id,
+            label,
+            bucket,
+            func.min(Reading.temperature),
+            func.max(Reading.temperature),
+            func.coalesce(func.sum(Reading.temperature), 0),
+            func.count(Reading.temperature),
+            func.min(Reading.humidity),
+            func.max(Reading.humidity),
+            func.coalesce(func.sum(Reading.humidity), 0),
+            func.count(Reading.humidity),
+        ).group_by(Reading.device_id, bucket)
+        return query, Reading.device_id, Reading.timestamp
+
+    bucket = truncate(Rollup.timestamp, timeframe)
+    query = (
+        select(
+            Rollup.device_id,
+            label,
+            bucket,
+            func.min(Rollup.temperature_min),
+            func.max(Rollup.temperature_max),
+            func.sum(Rollup.temperature_sum),
+            func.sum(Rollup.temperature_count),
+            func.min(Rollup.humidity_min),
+            func.max(Rollup.humidity_max),
+            func.sum(Rollup.humidity_sum),
+            func.sum(Rollup.humidity_count),
+        )
+        .where(Rollup.timeframe == SOURCES[timeframe])
+        .group_by(Rollup.device_id, bucket)
+    )
+    return query, Rollup.device_id, Rollup.timestamp
+
+
+def _bucket_range(timeframe: Timeframe, timestamp: datetime) -> tuple[datetime, datetime]:
+    start = GROUPINGS[timeframe](timestamp)
+    if timeframe == Timeframe.HOURLY:
+        return start, start + timedelta(hours=1)
+    if timeframe == Timeframe.DAILY:
+        return period(year=start.year, month=start.month, day=start.day)
+    if timeframe == Timeframe.MONTHLY:
+        return period(year=start.year, month=start.month)
+    return period(year=start.year)
+
+
+async def _refresh_range(
+    session: AsyncSession,
+    timeframe: Timeframe,
+    start: datetime,
+    end: datetime | None = None,
+    device_id: int | None = None,
+) -> int:
+    query, device_column, timestamp_column = _aggregate(timeframe=timeframe)
+    clear = delete(Rollup).where(Rollup.timeframe == timeframe, Rollup.timestamp >= start)
+    query = query.where(timestamp_column >= start)
+    if end:
+        clear = clear.where(Rollup.timestamp < end)
+        query = query.where(timestamp_column < end)
+    if device_id:
+        clear = clear.where(Rollup.device_id == device_id)
+        query = query.where(device_column == device_id)
+    await session.exec(clear)
+    return (await session.exec(insert(Rollup).from_select(COLUMNS, query))).rowcount
+
+
+async def refresh_rollups(session: AsyncSession, readings: list[Reading]) -> None:
+    for timeframe in Timeframe:
+        buckets = {
+            (x.device_id, *_bucket_range(timeframe=timeframe, timestamp=x.timestamp))
+            for x in readings
+        }
+        for device_id, start, end in buckets:
+            await _refresh_range(
+                session=session, timeframe=timeframe, start=start, end=end, device_id=device_id
+            )
+
+
+async def refresh_period(session: AsyncSession, start: datetime, end: datetime) -> None:
+    last = end - timedelta(microseconds=1)
+    for timeframe in Timeframe:
+        await _refresh_range(
+            session=session,
+            timeframe=timeframe,
+            start=_bucket_range(timeframe=timeframe, timestamp=start)[0],
+            end=_bucket_range(timeframe=timeframe, timestamp=last)[1],
+        )
+
+
+async def rebuild_rollups(session: AsyncSession, device_id: int | None = None) -> int:
+    # Readings before the compaction watermark only survive in the rollups, so only the
+    # buckets from the watermark onwards can be rebuilt.
+    watermark = await session.get(Compaction, CompactionSource.READINGS)
+    if watermark is None:
+        clear = delete(Rollup)
+        if device_id:
+            clear = clear.where(Rollup.device_id == device_id)
+        await session.exec(clear)
+
+    count = 0
+    for timeframe in Timeframe:
+        if watermark is not None:
+            count += await _refresh_range(
+                session=session,
+                timeframe=timeframe,
+                start=_bucket_range(timeframe=timeframe, timestamp=watermark.timestamp)[0],
+                device_id=device_id,
+            )
+            continue
+        query, device_column, _ = _aggregate(timeframe=timeframe)
+        if device_id:
+            query = query.where(device_column == device_id)
+        count += (await session.exec(insert(Rollup).from_select(COLUMNS, query))).rowcount
+    device_ids = [device_id] if device_id else await session.exec(select(Device.id))
+    mark_changed(session=session, device_ids=set(device_ids))
+    return count
+
+
+def _average(total: Decimal, count: int) -> Decimal | None:
+    return round(Decimal(total) / count, 2) if count else None
+
+
+async def summarize_rollups(
+    session: AsyncSession,
+    device_id: int,
+    timeframe: Timeframe,
+    year: int | None = None,
+    month: int | None = None,
+    day: int | None = None,
+    offset: int = 0,
+    limit: int = 100,
+) -> Summary:
+    query = (
+        select(Rollup)
+        .where(Rollup.device_id == device_id, Rollup.timeframe == timeframe)
+        .where(*timestamp_filters(column=Rollup.timestamp, year=year, month=month, day=day))
+        .order_by(Rollup.timestamp)
+        .offset(offset)
+        .limit(limit)
+    )
+    return _summary(rollups=await session.exec(query))
+
+
+def _summary(rollups: Iterable[Rollup]) -> Summary:
+    summary = Summary()
+    for rollup in rollups:
+        summary.highs.append(
+            Summary.Reading(
+                timestamp=rollup.timestamp,
+                temperature=rollup.temperature_max,
+                humidity=rollup.humidity_max,
+            )
+        )
+        summary.averages.append(
+            Summary.Reading(
+                timestamp=rollup.timestamp,
+                temperature=_average(rollup.temperature_sum, rollup.temperature_count),
+                humidity=_average(rollup.humidity_sum, rollup.humidity_count),
+            )
+        )
+        summary.lows.append(
+            Summary.Reading(
+                timestamp=rollup.timestamp,
+                temperature=rollup.temperature_min,
+                humidity=rollup.humidity_min,
+            )
+        )
+    return summary
+
+
+def _filters(
+    timeframe: Timeframe, year: int | None, month: int | None, day: int | None
+) -> dict[str, int | None]:
+    # The same filters each timeframe's own endpoint accepts.
+    return {
+        "year": None if timeframe == Timeframe.YEARLY else year,
+        "month": month if timeframe in (Timeframe.DAILY, Timeframe.HOURLY) else None,
+        "day": day if timeframe == Timeframe.HOURLY else None,
+    }
+
+
+async def summarize_rollup_timeframes(
+    session: AsyncSession,
+    device_id: int,
+    timeframes: list[Timeframe],
+    year: int | None = None,
+    month: int | None = None,
+    day: int | None = None,
+    limit: int = 100,
+) -> dict[Timeframe, Summary]:
+    conditions = [
+        and_(
+            Rollup.timeframe == x,
+            *timestamp_filters(
+                column=Rollup.timestamp, **_filters(timeframe=x, year=year, month=month, day=day)
+            ),
+        )
+        for x in timeframes
+    ]
+    position = func.row_number().over(partition_by=Rollup.timeframe, order_by=Rollup.timestamp)
+    ranked = (
+        select(Rollup, position.label("position"))
+        .where(Rollup.device_id == device_id, or_(*conditions))
+        .subquery()
+    )
+    rollup = aliased(Rollup, ranked)
+    query = (
+        select(rollup)
+        .where(ranked.c.position <= limit)
+        .order_by(ranked.c.timeframe, ranked.c.timestamp)
+    )
+    grouped: dict[Timeframe, list[Rollup]] = {x: [] for x in timeframes}
+    for entry in await session.exec(query):
+        grouped[entry.timeframe].append(entry)
+    return {x: _summary(rollups=grouped[x]) for x in timeframes}
+
+
+async def summarize_reading_timeframes(
+    session: AsyncSession,
+    device_id: int,
+    timeframes: list[Timeframe],
+    year: int | None = None,
+    month: int | None = None,
+    day: int | None = None,
+    limit: int = 100,
+) -> dict[Timeframe, Summary]:
+    # The readings are scanned once into hourly buckets which are folded into the coarser
+    # timeframes, only the least filtered timeframe bounds the scan.
+    widest = max(timeframes, key=list(Timeframe).index)
+    query, device_column, timestamp_column = _aggregate(timeframe=Timeframe.HOURLY)
+    query = query.where(device_column == device_id).where(
+        *timestamp_filters(
+            column=timestamp_column, **_filters(timeframe=widest, year=year, month=month, day=day)
+        )
+    )
+    columns = ReadingColumns()
+    for _, _, timestamp, *stats in await session.exec(query):
+        columns.append_bucket(timestamp=timestamp, temperature=stats[:4], humidity=stats[4:])
+    return {
+        x: summarize(
+            columns=columns,
+            grouping=GROUPINGS[x],
+            limit=limit,
+            **_filters(timeframe=x, year=year, month=month, day=day),
+        )
+        for x in timeframes
+    }
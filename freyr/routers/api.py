@@ -1,49 +1,157 @@
 __all__ = ["router"]
 
 import logging
+from collections.abc import Awaitable, Callable
 from datetime import datetime
-from typing import Annotated
+from math import ceil
+from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, desc, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlmodel import desc, func, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from freyr.database import get_session
+from freyr.cache import SUMMARY_CACHE, CacheKey, mark_changed
+from freyr.constants import constants
+from freyr.database import get_session, insert
+from freyr.downsample import Downsampler
+from freyr.events import event_stream, publish
+from freyr.export import export_readings
+from freyr.ingest import EXPIRED, INGEST_QUEUE, NDJSON, ingest_readings, load_items
 from freyr.models import (
+    BatchResult,
+    CacheStats,
+    Conflict,
     Device,
     DeviceCreate,
     DevicePublic,
     DeviceWithReadings,
+    ExportFormat,
     Reading,
     ReadingCreate,
     ReadingPublic,
+    Summaries,
     Summary,
+    Timeframe,
 )
-from freyr.responses import ErrorResponse
-from freyr.utils import (
-    get_daily_average_readings,
-    get_daily_high_readings,
-    get_daily_low_readings,
-    get_hourly_average_readings,
-    get_hourly_high_readings,
-    get_hourly_low_readings,
-    get_monthly_average_readings,
-    get_monthly_high_readings,
-    get_monthly_low_readings,
-    get_yearly_average_readings,
-    get_yearly_high_readings,
-    get_yearly_low_readings,
+from freyr.queries import (
+    decode_cursor,
+    encode_cursor,
+    get_latest_readings,
+    range_filters,
+    summarize_readings,
+)
+from freyr.responses import COLUMNS, ErrorResponse, pack_column_frames, pack_columns
+from freyr.retention import is_expired
+from freyr.rollups import (
+    summarize_reading_timeframes,
+    summarize_rollup_timeframes,
+    summarize_rollups,
+    update_rollups,
 )
 
 LOGGER = logging.getLogger(__name__)
+MAX_OFFSET_LIMIT = 100
+MAX_CURSOR_LIMIT = 5_000
+DOWNSAMPLE_CHUNK_SIZE = 5_000
+EVENT_STREAM = "text/event-stream"
+SUMMARY_RESPONSES = {
+    200: {"content": {COLUMNS: {"schema": {"type": "string", "format": "binary"}}}}
+}
 router = APIRouter(
     prefix="/api", responses={422: {"description": "Validation error", "model": ErrorResponse}}
 )
 
 
+async def read_batch(request: Request) -> list[Any]:
+    return load_items(
+        body=await request.body(), content_type=request.headers.get("Content-Type", "")
+    )
+
+
+def negotiate(request: Request) -> str:
+    return COLUMNS if COLUMNS in request.headers.get("Accept", "") else "application/json"
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored.
+    tags = {x.strip().removeprefix("W/") for x in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+async def cached_response(
+    request: Request, key: CacheKey, render: Callable[[], Awaitable[bytes]]
+) -> Response:
+    entry = SUMMARY_CACHE.get(key=key)
+    if entry is None:
+        entry = SUMMARY_CACHE.put(key=key, content=await render())
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if etag_matches(header=request.headers.get("If-None-Match"), etag=entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.content, media_type=key.media_type, headers=headers)
+
+
+async def summarize(
+    request: Request,
+    session: AsyncSession,
+    device_id: int,
+    timeframe: Timeframe,
+    year: int | None = None,
+    month: int | None = None,
+    day: int | None = None,
+    offset: int = 0,
+    limit: int = 100,
+) -> Response:
+    key = SUMMARY_CACHE.key(
+        device_id=device_id,
+        timeframes=(timeframe,),
+        year=year,
+        month=month,
+        day=day,
+        offset=offset,
+        limit=limit,
+        media_type=negotiate(request=request),
+    )
+
+    async def render() -> bytes:
+        summarizer = (
+            summarize_rollups if constants.settings.database.rollups else summarize_readings
+        )
+        summary = await summarizer(
+            session=session,
+            device_id=device_id,
+            timeframe=timeframe,
+            year=year,
+            month=month,
+            day=day,
+            offset=offset,
+            limit=limit,
+        )
+        if key.media_type == COLUMNS:
+            return pack_columns(summary=summary)
+        return summary.model_dump_json().encode()
+
+    return await cached_response(request=request, key=key, render=render)
+
+
+def parse_timeframes(timeframes: str = "yearly,monthly,daily,hourly") -> list[Timeframe]:
+    try:
+        values = [Timeframe(x.strip().upper()) for x in timeframes.split(",")]
+    except ValueError as err:
+        raise HTTPException(
+            status_code=422,
+            detail="timeframes: Expected a comma separated list of yearly, monthly, daily, hourly",
+        ) from err
+    return list(dict.fromkeys(values))
+
+
 @router.get(path="/devices", response_model=list[DevicePublic])
-def list_devices(
+async def list_devices(
     *,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
     name: str | None = None,
     offset: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(le=100)] = 100,
@@ -52,173 +160,447 @@ def list_devices(
     if name:
         query = query.where(Device.name == name)
     query = query.order_by(Device.name).offset(offset).limit(limit)
-    devices = session.exec(query).all()
-    output = []
-    for device in devices:
-        latest_reading = device.readings[0] if device.readings else None
-        output.append(DevicePublic(id=device.id, name=device.name, reading=latest_reading))
-    return output
+    devices = (await session.exec(query)).all()
+    latest = await get_latest_readings(session=session, device_ids=[x.id for x in devices])
+    return [DevicePublic(id=x.id, name=x.name, reading=latest.get(x.id)) for x in devices]
 
 
 @router.post(path="/devices", status_code=201, response_model=DeviceWithReadings)
-def create_device(*, session: Annotated[Session, Depends(get_session)], device: DeviceCreate):
-    if list_devices(session=session, name=device.name, limit=1):
+async def create_device(
+    *, session: Annotated[AsyncSession, Depends(get_session)], device: DeviceCreate
+):
+    if await list_devices(session=session, name=device.name, limit=1):
         raise HTTPException(status_code=409, detail="Device already exists")
 
     db_device = Device.model_validate(device)
     session.add(db_device)
-    session.commit()
-    session.refresh(db_device)
-    return db_device
+    await session.commit()
+    return DeviceWithReadings(id=db_device.id, name=db_device.name)
 
 
 @router.get(path="/devices/{device_id}", response_model=DeviceWithReadings)
-def get_device(*, session: Annotated[Session, Depends(get_session)], device_id: int):
-    device = session.get(Device, device_id)
+async def get_device(*, session: Annotated[AsyncSession, Depends(get_session)], device_id: int):
+    device = await session.get(Device, device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found.")
-    return device
+    query = select(Reading).where(Reading.device_id == device.id).order_by(Reading.timestamp.desc())
+    readings = (await session.exec(query)).all()
+    return DeviceWithReadings(id=device.id, name=device.name, readings=readings)
 
 
 @router.get(path="/devices/{device_id}/readings", response_model=list[ReadingPublic])
-def list_device_readings(
+async def list_device_readings(
     *,
-    session: Annotated[Session, Depends(get_session)],
+    response: Response,
+    session: Annotated[AsyncSession, Depends(get_session)],
     device_id: int,
     timestamp: datetime | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    cursor: str | None = None,
     offset: Annotated[int, Query(ge=0)] = 0,
-    limit: Annotated[int, Query(le=100)] = 100,
+    limit: Annotated[int, Query(le=MAX_CURSOR_LIMIT)] = 100,
 ):
-    return list_readings(
-        session=session, device_id=device_id, timestamp=timestamp, offset=offset, limit=limit
+    return await list_readings(
+        response=response,
+        session=session,
+        device_id=device_id,
+        timestamp=timestamp,
+        start=start,
+        end=end,
+        cursor=cursor,
+        offset=offset,
+        limit=limit,
     )
 
 
 @router.post(path="/devices/{device_id}/readings", status_code=201, response_model=ReadingPublic)
-def create_device_reading(
-    *, session: Annotated[Session, Depends(get_session)], device_id: int, reading: ReadingCreate
+async def create_device_reading(
+    *,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    device_id: int,
+    reading: ReadingCreate,
 ):
     if reading.device_id is None:
         reading.device_id = device_id
     elif reading.device_id != device_id:
         raise HTTPException(status_code=400, detail="Body device_id doesn't match Path device_id")
-    return create_reading(session=session, reading=reading)
+    return await create_reading(session=session, reading=reading)
+
+
+@router.post(path="/devices/{device_id}/readings/batch", response_model=list[BatchResult])
+async def create_device_readings(
+    *,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    device_id: int,
+    items: Annotated[list[Any], Depends(read_batch)],
+    conflict: Conflict = Conflict.SKIP,
+):
+    results = await ingest_readings(
+        session=session, items=items, conflict=conflict, device_id=device_id
+    )
+    await session.commit()
+    return results
 
 
-@router.get(path="/devices/{device_id}/readings/yearly")
-def yearly_readings(
+@router.get(
+    path="/devices/{device_id}/readings/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Readings in ascending timestamp order",
+            "content": {"text/csv": {}, NDJSON: {}, "application/gzip": {}},
+        },
+        404: {"description": "Device not found", "model": ErrorResponse},
+    },
+)
+async def export_device_readings(
+    *,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    device_id: int,
+    format: ExportFormat = ExportFormat.NDJSON,  # noqa: A002
+    start: datetime | None = None,
+    end: datetime | None = None,
+    compress: bool = False,
+) -> StreamingResponse:
+    if not await session.get(Device, device_id):
+        raise HTTPException(status_code=404, detail="Device not found.")
+    filename = f"device-{device_id}-readings.{format.value.lower()}"
+    media_type = "text/csv" if format == ExportFormat.CSV else NDJSON
+    if compress:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        content=export_readings(
+            device_id=device_id, export_format=format, start=start, end=end, compress=compress
+        ),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get(
+    path="/devices/{device_id}/readings/downsampled",
+    response_model=list[ReadingPublic],
+    responses={404: {"description": "Device not found", "model": ErrorResponse}},
+)
+async def downsampled_readings(
     *,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    device_id: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    points: Annotated[int, Query(ge=3, le=MAX_CURSOR_LIMIT)] = 1000,
+):
+    if not await session.get(Device, device_id):
+        raise HTTPException(status_code=404, detail="Device not found.")
+    filters = [
+        Reading.device_id == device_id,
+        *range_filters(column=Reading.timestamp, start=start, end=end),
+    ]
+    first, last, count = (
+        await session.exec(
+            select(func.min(Reading.timestamp), func.max(Reading.timestamp), func.count()).where(
+                *filters
+            )
+        )
+    ).one()
+    query = (
+        select(Reading.id, Reading.timestamp, Reading.temperature, Reading.humidity)
+        .where(*filters)
+        .order_by(Reading.timestamp)
+    )
+    if count <= points:
+        rows = (await session.exec(query)).all()
+    else:
+        downsampler = Downsampler(points=points, start=first, end=last)
+        result = await session.stream(query.execution_options(yield_per=DOWNSAMPLE_CHUNK_SIZE))
+        async for partition in result.partitions():
+            for row in partition:
+                downsampler.add(row=row)
+        rows = downsampler.result()
+    return [
+        ReadingPublic(id=id_, timestamp=timestamp, temperature=temperature, humidity=humidity)
+        for id_, timestamp, temperature, humidity in rows
+    ]
+
+
+@router.get(
+    path="/devices/{device_id}/readings/yearly", response_model=Summary, responses=SUMMARY_RESPONSES
+)
+async def yearly_readings(
+    *,
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_session)],
     device_id: int,
     offset: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(le=100)] = 100,
-) -> Summary:
-    readings = session.exec(select(Reading).where(Reading.device_id == device_id)).all()
-    return Summary(
-        highs=get_yearly_high_readings(readings=readings)[offset : offset + limit],
-        averages=get_yearly_average_readings(readings=readings)[offset : offset + limit],
-        lows=get_yearly_low_readings(readings=readings)[offset : offset + limit],
+) -> Response:
+    return await summarize(
+        request=request,
+        session=session,
+        device_id=device_id,
+        timeframe=Timeframe.YEARLY,
+        offset=offset,
+        limit=limit,
     )
 
 
-@router.get(path="/devices/{device_id}/readings/monthly")
-def monthly_readings(
+@router.get(
+    path="/devices/{device_id}/readings/monthly",
+    response_model=Summary,
+    responses=SUMMARY_RESPONSES,
+)
+async def monthly_readings(
     *,
-    session: Annotated[Session, Depends(get_session)],
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_session)],
     device_id: int,
     year: int | None = None,
     offset: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(le=100)] = 100,
-) -> Summary:
-    readings = session.exec(select(Reading).where(Reading.device_id == device_id)).all()
-    return Summary(
-        highs=get_monthly_high_readings(readings=readings, year=year)[offset : offset + limit],
-        averages=get_monthly_average_readings(readings=readings, year=year)[
-            offset : offset + limit
-        ],
-        lows=get_monthly_low_readings(readings=readings, year=year)[offset : offset + limit],
+) -> Response:
+    return await summarize(
+        request=request,
+        session=session,
+        device_id=device_id,
+        timeframe=Timeframe.MONTHLY,
+        year=year,
+        offset=offset,
+        limit=limit,
     )
 
 
-@router.get(path="/devices/{device_id}/readings/daily")
-def daily_readings(
+@router.get(
+    path="/devices/{device_id}/readings/daily", response_model=Summary, responses=SUMMARY_RESPONSES
+)
+async def daily_readings(
     *,
-    session: Annotated[Session, Depends(get_session)],
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_session)],
     device_id: int,
     year: int | None = None,
     month: int | None = None,
     offset: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(le=100)] = 100,
-) -> Summary:
-    readings = session.exec(select(Reading).where(Reading.device_id == device_id)).all()
-    return Summary(
-        highs=get_daily_high_readings(readings=readings, year=year, month=month)[
-            offset : offset + limit
-        ],
-        averages=get_daily_average_readings(readings=readings, year=year, month=month)[
-            offset : offset + limit
-        ],
-        lows=get_daily_low_readings(readings=readings, year=year, month=month)[
-            offset : offset + limit
-        ],
+) -> Response:
+    return await summarize(
+        request=request,
+        session=session,
+        device_id=device_id,
+        timeframe=Timeframe.DAILY,
+        year=year,
+        month=month,
+        offset=offset,
+        limit=limit,
     )
 
 
-@router.get(path="/devices/{device_id}/readings/hourly")
-def hourly_readings(
+@router.get(
+    path="/devices/{device_id}/readings/hourly", response_model=Summary, responses=SUMMARY_RESPONSES
+)
+async def hourly_readings(
     *,
-    session: Annotated[Session, Depends(get_session)],
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_session)],
     device_id: int,
     year: int | None = None,
     month: int | None = None,
     day: int | None = None,
     offset: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(le=100)] = 100,
-) -> Summary:
-    readings = session.exec(select(Reading).where(Reading.device_id == device_id)).all()
-    return Summary(
-        highs=get_hourly_high_readings(readings=readings, year=year, month=month, day=day)[
-            offset : offset + limit
-        ],
-        averages=get_hourly_average_readings(readings=readings, year=year, month=month, day=day)[
-            offset : offset + limit
-        ],
-        lows=get_hourly_low_readings(readings=readings, year=year, month=month, day=day)[
-            offset : offset + limit
-        ],
+) -> Response:
+    return await summarize(
+        request=request,
+        session=session,
+        device_id=device_id,
+        timeframe=Timeframe.HOURLY,
+        year=year,
+        month=month,
+        day=day,
+        offset=offset,
+        limit=limit,
+    )
+
+
+@router.get(
+    path="/devices/{device_id}/readings/summary",
+    response_model=Summaries,
+    responses={
+        200: {
+            "content": {COLUMNS: {"schema": {"type": "string", "format": "binary"}}},
+            "description": "Packed summaries in the order of the requested timeframes",
+        }
+    },
+)
+async def summary_readings(
+    *,
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    device_id: int,
+    timeframes: Annotated[list[Timeframe], Depends(parse_timeframes)],
+    year: int | None = None,
+    month: int | None = None,
+    day: int | None = None,
+    limit: Annotated[int, Query(le=100)] = 100,
+) -> Response:
+    key = SUMMARY_CACHE.key(
+        device_id=device_id,
+        timeframes=tuple(timeframes),
+        year=year,
+        month=month,
+        day=day,
+        offset=0,
+        limit=limit,
+        media_type=negotiate(request=request),
     )
 
+    async def render() -> bytes:
+        summarizer = (
+            summarize_rollup_timeframes
+            if constants.settings.database.rollups
+            else summarize_reading_timeframes
+        )
+        summaries = await summarizer(
+            session=session,
+            device_id=device_id,
+            timeframes=timeframes,
+            year=year,
+            month=month,
+            day=day,
+            limit=limit,
+        )
+        if key.media_type == COLUMNS:
+            return pack_column_frames(summaries=list(summaries.values()))
+        content = {x.value.lower(): y for x, y in summaries.items()}
+        return Summaries(**content).model_dump_json(include=set(content)).encode()
+
+    return await cached_response(request=request, key=key, render=render)
+
 
 @router.get(path="/readings", response_model=list[ReadingPublic])
-def list_readings(
+async def list_readings(
     *,
-    session: Annotated[Session, Depends(get_session)],
+    response: Response,
+    session: Annotated[AsyncSession, Depends(get_session)],
     device_id: int | None = None,
     timestamp: datetime | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    cursor: str | None = None,
     offset: Annotated[int, Query(ge=0)] = 0,
-    limit: Annotated[int, Query(le=100)] = 100,
+    limit: Annotated[int, Query(le=MAX_CURSOR_LIMIT)] = 100,
 ):
+    if offset and cursor:
+        raise HTTPException(status_code=422, detail="cursor: Can't be combined with offset")
+    if offset and limit > MAX_OFFSET_LIMIT:
+        raise HTTPException(
+            status_code=422,
+            detail=f"limit: Must be at most {MAX_OFFSET_LIMIT} when paging with offset",
+        )
     query = select(Reading)
     if device_id:
         query = query.where(Reading.device_id == device_id)
     if timestamp:
         query = query.where(Reading.timestamp == timestamp)
-    query = query.order_by(desc(Reading.timestamp)).offset(offset).limit(limit)
-    return session.exec(query).all()
+    query = query.where(*range_filters(column=Reading.timestamp, start=start, end=end))
+    if cursor:
+        try:
+            last_timestamp, last_id = decode_cursor(cursor=cursor)
+        except ValueError as err:
+            raise HTTPException(status_code=422, detail="cursor: Invalid cursor") from err
+        query = query.where(
+            Reading.timestamp <= last_timestamp,
+            or_(Reading.timestamp < last_timestamp, Reading.id < last_id),
+        )
+    query = query.order_by(desc(Reading.timestamp), desc(Reading.id)).offset(offset).limit(limit)
+    readings = (await session.exec(query)).all()
+    if readings and len(readings) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(reading=readings[-1])
+    return readings
 
 
-@router.post(path="/readings", status_code=201, response_model=ReadingPublic)
-def create_reading(*, session: Annotated[Session, Depends(get_session)], reading: ReadingCreate):
+@router.post(
+    path="/readings",
+    status_code=201,
+    response_model=ReadingPublic,
+    responses={
+        202: {"description": "Queued for ingestion", "model": ReadingCreate},
+        503: {"description": "Ingestion queue is full", "model": ErrorResponse},
+    },
+)
+async def create_reading(
+    *, session: Annotated[AsyncSession, Depends(get_session)], reading: ReadingCreate
+):
     if reading.timestamp is None:
         reading.timestamp = datetime.fromisoformat(datetime.now().isoformat(timespec="seconds"))
+    elif is_expired(timestamp=reading.timestamp):
+        raise HTTPException(status_code=422, detail=EXPIRED)
 
-    if list_readings(
-        session=session, device_id=reading.device_id, timestamp=reading.timestamp, limit=1
-    ):
-        raise HTTPException(status_code=409, detail="Device Reading already exists")
+    if constants.settings.ingest.queued:
+        if reading.device_id is None:
+            raise HTTPException(status_code=422, detail="device_id: Field required")
+        if not INGEST_QUEUE.put(reading=reading):
+            raise HTTPException(
+                status_code=503,
+                detail="Ingestion queue is full",
+                headers={"Retry-After": str(ceil(constants.settings.ingest.flush_interval))},
+            )
+        return JSONResponse(status_code=202, content=jsonable_encoder(reading))
 
     db_reading = Reading.model_validate(reading)
-    session.add(db_reading)
-    session.commit()
-    session.refresh(db_reading)
+    statement = (
+        insert(Reading)
+        .values(**db_reading.model_dump(exclude={"id"}))
+        .on_conflict_do_nothing(index_elements=[Reading.device_id, Reading.timestamp])
+        .returning(Reading.id)
+    )
+    db_reading.id = (await session.exec(statement)).scalar_one_or_none()
+    if db_reading.id is None:
+        raise HTTPException(status_code=409, detail="Device Reading already exists")
+    mark_changed(session=session, device_ids=[db_reading.device_id])
+    publish(session=session, readings=[db_reading])
+    if constants.settings.database.rollups:
+        await update_rollups(session=session, readings=[db_reading])
+    await session.commit()
     return db_reading
+
+
+@router.post(path="/readings/batch", response_model=list[BatchResult])
+async def create_readings(
+    *,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    items: Annotated[list[Any], Depends(read_batch)],
+    conflict: Conflict = Conflict.SKIP,
+):
+    results = await ingest_readings(session=session, items=items, conflict=conflict)
+    await session.commit()
+    return results
+
+
+@router.get(
+    path="/stream",
+    response_class=StreamingResponse,
+    responses={
+        200: {"description": "Server-Sent Events of new readings", "content": {EVENT_STREAM: {}}},
+        404: {"description": "Device not found", "model": ErrorResponse},
+    },
+)
+async def stream_readings(
+    *,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    request: Request,
+    device_id: int | None = None,
+) -> StreamingResponse:
+    if device_id is not None and not await session.get(Device, device_id):
+        raise HTTPException(status_code=404, detail="Device not found.")
+    return StreamingResponse(
+        content=event_stream(request=request, device_id=device_id),
+        media_type=EVENT_STREAM,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(path="/cache", response_model=CacheStats)
+async def cache_stats():
+    return SUMMARY_CACHE.stats()
@@ -1,65 +1,84 @@
-__all__ = ["router"]
+__all__ = ["get_templates", "router"]
 
-from typing import Annotated
+from functools import cache
+from typing import TYPE_CHECKING, Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse, Response
-from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select
+from sqlalchemy import Row
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from freyr import get_project
+from freyr import get_cache, get_project
+from freyr.constants import constants
 from freyr.database import get_session
 from freyr.models import Device
+from freyr.queries import get_calendar
+
+if TYPE_CHECKING:
+    from fastapi.templating import Jinja2Templates
 
 router = APIRouter(tags=["WebInterface"], include_in_schema=False)
-templates = Jinja2Templates(directory=str(get_project() / "templates"))
+
+
+@cache
+def get_templates() -> "Jinja2Templates":
+    # Jinja is imported on the first page view instead of at startup, and compiled templates
+    # are cached on disk so each new process skips compiling them again.
+    from fastapi.templating import Jinja2Templates  # noqa: PLC0415
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader  # noqa: PLC0415
+
+    folder = get_cache() / "templates"
+    folder.mkdir(exist_ok=True)
+    environment = Environment(
+        loader=FileSystemLoader(get_project() / "templates"),
+        autoescape=True,
+        bytecode_cache=FileSystemBytecodeCache(directory=str(folder)),
+    )
+    return Jinja2Templates(env=environment)
+
+
+async def list_devices(session: AsyncSession) -> list[Row]:
+    # The navbar only links to each device.
+    return (await session.exec(select(Device.id, Device.name).order_by(Device.name))).all()
 
 
 @router.get("/", response_class=HTMLResponse)
-def dashboard(*, request: Request, session: Annotated[Session, Depends(get_session)]) -> Response:
-    devices = session.exec(select(Device)).all()
-    return templates.TemplateResponse(
-        name="dashboard.html.jinja", context={"request": request, "devices": sorted(devices)}
+async def dashboard(
+    *, request: Request, session: Annotated[AsyncSession, Depends(get_session)]
+) -> Response:
+    return get_templates().TemplateResponse(
+        name="dashboard.html.jinja",
+        context={"request": request, "devices": await list_devices(session=session)},
     )
 
 
 @router.get(path="/{device_id}", response_class=HTMLResponse)
-def get_device(
+async def get_device(
     *,
     request: Request,
-    session: Annotated[Session, Depends(get_session)],
+    session: Annotated[AsyncSession, Depends(get_session)],
     device_id: int,
     year: int | None = None,
     month: int | None = None,
     day: int | None = None,
 ) -> Response:
-    devices = session.exec(select(Device)).all()
-    device = session.get(Device, device_id)
+    device = await session.get(Device, device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found.")
-    return templates.TemplateResponse(
+    return get_templates().TemplateResponse(
         name="device.html.jinja",
         context={
             "request": request,
-            "devices": sorted(devices),
+            "devices": await list_devices(session=session),
             "resource": device,
-            "options": {
-                "years": sorted({x.timestamp.year for x in device.readings}),
-                "months": sorted(
-                    {x.timestamp.month for x in device.readings if x.timestamp.year == year}
-                )
-                if year
-                else [],
-                "days": sorted(
-                    {
-                        x.timestamp.day
-                        for x in device.readings
-                        if x.timestamp.year == year and x.timestamp.month == month
-                    }
-                )
-                if year and month
-                else [],
-            },
+            "options": await get_calendar(
+                session=session,
+                device_id=device_id,
+                year=year,
+                month=month,
+                rollups=constants.settings.database.rollups,
+            ),
             "selected": {"year": year, "month": month, "day": day},
         },
     )
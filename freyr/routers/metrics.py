@@ -0,0 +1,13 @@
+__all__ = ["router"]
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from freyr.metrics import METRICS
+
+router = APIRouter(tags=["Metrics"], include_in_schema=False)
+
+
+@router.get(path="/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(content=METRICS.render(), media_type="text/plain; version=0.0.4")
@@ -27,10 +27,26 @@ class Source(str, Enum):
     SQLITE = "SQLITE"
 
 
+class Profile(str, Enum):
+    DEFAULT = "DEFAULT"
+    READ_HEAVY = "READ_HEAVY"
+    WRITE_HEAVY = "WRITE_HEAVY"
+
+
+class CacheSettings(SettingsModel):
+    size: int = 1024
+    ttl: float = 300.0
+
+
 class DatabaseSettings(SettingsModel):
     host: str = ""
+    max_overflow: int | None = None
     name: str = "freyr.sqlite"
+    partitioned: bool = False
+    partitions_ahead: int = 3
     password: str = ""
+    pool_size: int | None = None
+    rollups: bool = True
     source: Source = Source.SQLITE
     user: str = ""
 
@@ -38,30 +54,70 @@ class DatabaseSettings(SettingsModel):
     def db_url(self: Self) -> str:
         if self.source == Source.POSTGRES:
             return f"postgresql+psycopg://{self.user}:{self.password}@{self.host}/{self.name}"
-        return f"sqlite:///{self.name}"
+        return f"sqlite+aiosqlite:///{self.name}"
+
+
+class IngestSettings(SettingsModel):
+    batch_size: int = 500
+    flush_interval: float = 1.0
+    queue_size: int = 10_000
+    queued: bool = False
+
+
+class PerformanceSettings(SettingsModel):
+    profile: Profile = Profile.DEFAULT
+    profiling: bool = False
+    repeated_queries: int = 5
+    slow_query: float = 0.1
+
+
+class RetentionSettings(SettingsModel):
+    chunk_size: int = 10_000
+    enabled: bool = False
+    hourly_days: int = 1825
+    interval: float = 3600.0
+    readings_days: int = 90
+
+
+class StreamSettings(SettingsModel):
+    buffer_size: int = 256
+    keepalive: float = 15.0
 
 
 class WebsiteSettings(SettingsModel):
     host: str = "127.0.0.1"
     port: int = 25710
     reload: bool = False
+    shutdown_timeout: float = 5.0
+    workers: int = 1
 
 
 class Settings(SettingsModel):
     _filepath: ClassVar[Path] = get_config() / "settings.toml"
+    cache: CacheSettings = CacheSettings()
     database: DatabaseSettings = DatabaseSettings()
+    ingest: IngestSettings = IngestSettings()
+    performance: PerformanceSettings = PerformanceSettings()
+    retention: RetentionSettings = RetentionSettings()
+    stream: StreamSettings = StreamSettings()
     website: WebsiteSettings = WebsiteSettings()
 
     @classmethod
     def load(cls: type[Self]) -> Self:
         if not cls._filepath.exists():
-            cls().save()
+            return cls().save()
         with cls._filepath.open("rb") as stream:
             content = tomlreader.load(stream)
-        return cls(**content)
+        settings = cls(**content)
+        # Only rewritten to add new settings, so starting (and every worker) leaves it untouched.
+        if settings._dump() != content:
+            settings.save()
+        return settings
+
+    def _dump(self: Self) -> dict:
+        return self.model_dump(by_alias=False, exclude_none=True)
 
     def save(self: Self) -> Self:
         with self._filepath.open("wb") as stream:
-            content = self.model_dump(by_alias=False)
-            tomlwriter.dump(content, stream)
+            tomlwriter.dump(self._dump(), stream)
         return self
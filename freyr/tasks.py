@@ -0,0 +1,47 @@
+__all__ = ["PeriodicTask"]
+
+import asyncio
+import contextlib
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any, Self
+
+LOGGER = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    def __init__(
+        self: Self,
+        name: str,
+        interval: float,
+        job: Callable[[], Awaitable[Any]],
+        lease: Callable[[str, float], Awaitable[bool]] | None = None,
+    ) -> None:
+        self.name = name
+        self.interval = interval
+        self.job = job
+        # With several workers only the one holding the lease runs the job, the lease outlives
+        # a missed run so another worker takes over if the holder stops.
+        self.lease = lease
+        self.result: Any = None
+        self._task: asyncio.Task | None = None
+
+    def start(self: Self) -> None:
+        self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self: Self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def _run(self: Self) -> None:
+        while True:
+            try:
+                if self.lease is None or await self.lease(self.name, self.interval * 2):
+                    self.result = await self.job()
+            except Exception:
+                LOGGER.exception("Failed to run %s", self.name)
+            await asyncio.sleep(self.interval)
@@ -1,4 +1,6 @@
 __all__ = [
+    "ReadingColumns",
+    "summarize",
     "get_hourly_low_readings",
     "get_hourly_average_readings",
     "get_hourly_high_readings",
@@ -13,11 +15,18 @@
     "get_yearly_high_readings",
 ]
 
-from collections.abc import Callable
-from datetime import datetime
+from array import array
+from collections.abc import Callable, Iterable, Sequence
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Self
 
 from freyr.models import Reading, Summary
 
+EPOCH = datetime(1970, 1, 1)
+# Values are kept in hundredths, integer sums don't drift the way float sums do.
+SCALE = 100
+
 
 def filter_readings(
     readings: list[Summary.Reading],
@@ -47,19 +56,19 @@ def aggregate_readings(
 
 
 def hour_grouping(value: datetime) -> datetime:
-    return value.replace(second=0, minute=0)
+    return value.replace(microsecond=0, second=0, minute=0)
 
 
 def day_grouping(value: datetime) -> datetime:
-    return value.replace(second=0, minute=0, hour=0)
+    return value.replace(microsecond=0, second=0, minute=0, hour=0)
 
 
 def month_grouping(value: datetime) -> datetime:
-    return value.replace(second=0, minute=0, hour=0, day=1)
+    return value.replace(microsecond=0, second=0, minute=0, hour=0, day=1)
 
 
 def year_grouping(value: datetime) -> datetime:
-    return value.replace(second=0, minute=0, hour=0, day=1, month=1)
+    return value.replace(microsecond=0, second=0, minute=0, hour=0, day=1, month=1)
 
 
 def high_aggregation(key: datetime, values: list[Reading]) -> Summary.Reading:
@@ -212,3 +221,171 @@ def get_yearly_average_readings(readings: list[Reading]) -> list[Summary.Reading
 
 def get_yearly_low_readings(readings: list[Reading]) -> list[Summary.Reading]:
     return get_readings(readings=readings, grouping=year_grouping, aggregation=low_aggregation)
+
+
+def _to_epoch(value: datetime) -> int:
+    return (value - EPOCH) // timedelta(seconds=1)
+
+
+def _from_epoch(value: int) -> datetime:
+    return EPOCH + timedelta(seconds=value)
+
+
+def _scale(value: Decimal | float | None) -> int:
+    return 0 if value is None else round(value * SCALE)
+
+
+def _unscale(value: int, count: int = 1) -> Decimal | None:
+    return round(Decimal(value) / (count * SCALE), 2) if count else None
+
+
+class ReadingColumns:
+    __slots__ = (
+        "humidity_count",
+        "humidity_max",
+        "humidity_min",
+        "humidity_sum",
+        "temperature_count",
+        "temperature_max",
+        "temperature_min",
+        "temperature_sum",
+        "timestamps",
+    )
+
+    def __init__(self: Self) -> None:
+        for name in self.__slots__:
+            setattr(self, name, array("q"))
+
+    def __len__(self: Self) -> int:
+        return len(self.timestamps)
+
+    def append(
+        self: Self, timestamp: datetime, temperature: Decimal | None, humidity: Decimal | None
+    ) -> None:
+        # A single reading is a bucket of one, scaled once instead of per column.
+        self.timestamps.append(_to_epoch(timestamp))
+        value = _scale(temperature)
+        self.temperature_min.append(value)
+        self.temperature_max.append(value)
+        self.temperature_sum.append(value)
+        self.temperature_count.append(temperature is not None)
+        value = _scale(humidity)
+        self.humidity_min.append(value)
+        self.humidity_max.append(value)
+        self.humidity_sum.append(value)
+        self.humidity_count.append(humidity is not None)
+
+    def append_bucket(
+        self: Self,
+        timestamp: datetime,
+        temperature: Sequence[Decimal | float | int | None],
+        humidity: Sequence[Decimal | float | int | None],
+    ) -> None:
+        # Already aggregated buckets, such as hourly rollups, as a min, max, sum and count.
+        self.timestamps.append(_to_epoch(timestamp))
+        low, high, total, count = temperature
+        self.temperature_min.append(_scale(low))
+        self.temperature_max.append(_scale(high))
+        self.temperature_sum.append(_scale(total))
+        self.temperature_count.append(count)
+        low, high, total, count = humidity
+        self.humidity_min.append(_scale(low))
+        self.humidity_max.append(_scale(high))
+        self.humidity_sum.append(_scale(total))
+        self.humidity_count.append(count)
+
+    @classmethod
+    def from_rows(
+        cls: type[Self], rows: Iterable[tuple[datetime, Decimal | None, Decimal | None]]
+    ) -> Self:
+        columns = cls()
+        for timestamp, temperature, humidity in rows:
+            columns.append(timestamp=timestamp, temperature=temperature, humidity=humidity)
+        return columns
+
+
+def _fold(
+    columns: ReadingColumns, grouping: Callable[[datetime], datetime]
+) -> dict[int, list[int]]:
+    # Every grouping is at least an hour wide, so each hour only needs to be grouped once.
+    keys: dict[int, int] = {}
+    # [temperature min, max, sum, count, humidity min, max, sum, count]
+    stats: dict[int, list[int]] = {}
+    for timestamp, t_min, t_max, t_sum, t_count, h_min, h_max, h_sum, h_count in zip(
+        columns.timestamps,
+        columns.temperature_min,
+        columns.temperature_max,
+        columns.temperature_sum,
+        columns.temperature_count,
+        columns.humidity_min,
+        columns.humidity_max,
+        columns.humidity_sum,
+        columns.humidity_count,
+        strict=True,
+    ):
+        hour = timestamp - timestamp % 3600
+        if (key := keys.get(hour)) is None:
+            key = keys[hour] = _to_epoch(grouping(_from_epoch(hour)))
+        if (entry := stats.get(key)) is None:
+            entry = stats[key] = [0, 0, 0, 0, 0, 0, 0, 0]
+        # Comparisons are inlined as min()/max() calls are ~3x slower in this loop.
+        if t_count:
+            if not entry[3] or t_min < entry[0]:
+                entry[0] = t_min
+            if not entry[3] or t_max > entry[1]:
+                entry[1] = t_max
+            entry[2] += t_sum
+            entry[3] += t_count
+        if h_count:
+            if not entry[7] or h_min < entry[4]:
+                entry[4] = h_min
+            if not entry[7] or h_max > entry[5]:
+                entry[5] = h_max
+            entry[6] += h_sum
+            entry[7] += h_count
+    return stats
+
+
+def summarize(
+    columns: ReadingColumns,
+    grouping: Callable[[datetime], datetime],
+    year: int | None = None,
+    month: int | None = None,
+    day: int | None = None,
+    limit: int | None = None,
+) -> Summary:
+    stats = _fold(columns=columns, grouping=grouping)
+    summary = Summary()
+    for key in sorted(stats):
+        timestamp = _from_epoch(key)
+        if (
+            (year and timestamp.year != year)
+            or (month and timestamp.month != month)
+            or (day and timestamp.day != day)
+        ):
+            continue
+        if limit is not None and len(summary.highs) >= limit:
+            break
+        t_min, t_max, t_sum, t_count, h_min, h_max, h_sum, h_count = stats[key]
+        summary.highs.append(
+            Summary.Reading(
+                timestamp=timestamp,
+                temperature=_unscale(t_max) if t_count else None,
+                humidity=_unscale(h_max) if h_count else None,
+            )
+        )
+        summary.averages.append(
+            Summary.Reading(
+                timestamp=timestamp,
+                temperature=_unscale(t_sum, count=t_count),
+                humidity=_unscale(h_sum, count=h_count),
+            )
+        )
+        summary.lows.append(
+            Summary.Reading(
+                timestamp=timestamp,
+                temperature=_unscale(t_min) if t_count else None,
+                humidity=_unscale(h_min) if h_count else None,
+            )
+        )
+    return summary
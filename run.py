@@ -1,11 +1,168 @@
+import asyncio
 import contextlib
+import importlib
+import logging
+import os
+from argparse import ArgumentParser
+from collections.abc import Callable
 
-import uvicorn
+from rich.table import Table
 
+from freyr import elapsed_timer, get_project, setup_logging
+from freyr.console import CONSOLE
 from freyr.constants import constants
 
+LOGGER = logging.getLogger("freyr")
+
+
+# SQLAlchemy and FastAPI take most of the startup time, so they're only imported by the commands
+# that use them.
+async def rebuild_rollups() -> None:
+    from sqlmodel.ext.asyncio.session import AsyncSession  # noqa: PLC0415
+
+    from freyr.database import create_db_and_tables, engine  # noqa: PLC0415
+    from freyr.rollups import rebuild_rollups as _rebuild_rollups  # noqa: PLC0415
+
+    setup_logging()
+    await create_db_and_tables()
+    async with AsyncSession(engine) as session:
+        count = await _rebuild_rollups(session=session)
+        await session.commit()
+    await engine.dispose()
+    LOGGER.info("Rebuilt %d rollups", count)
+
+
+async def dedupe() -> None:
+    from sqlmodel.ext.asyncio.session import AsyncSession  # noqa: PLC0415
+
+    from freyr.database import (  # noqa: PLC0415
+        DUPLICATES_TABLE,
+        create_db_and_tables,
+        engine,
+        remove_duplicate_readings,
+    )
+    from freyr.rollups import rebuild_rollups as _rebuild_rollups  # noqa: PLC0415
+
+    setup_logging()
+    count = await remove_duplicate_readings()
+    await create_db_and_tables()
+    LOGGER.info("Moved %d duplicate readings to %s", count, DUPLICATES_TABLE)
+    if count and constants.settings.database.rollups:
+        async with AsyncSession(engine) as session:
+            await _rebuild_rollups(session=session)
+            await session.commit()
+        LOGGER.info("Rebuilt the rollups without the duplicates")
+    await engine.dispose()
+
+
+async def prepare_workers() -> None:
+    from freyr.database import create_db_and_tables, engine  # noqa: PLC0415
+
+    setup_logging()
+    await create_db_and_tables()
+    await engine.dispose()
+    LOGGER.info(
+        "Starting %d workers, caches, live streams and ingest queues are per worker",
+        constants.settings.website.workers,
+    )
+
+
+async def compact() -> None:
+    from freyr.database import create_db_and_tables, engine  # noqa: PLC0415
+    from freyr.retention import compact as _compact  # noqa: PLC0415
+
+    setup_logging()
+    await create_db_and_tables()
+    await _compact()
+    await engine.dispose()
+
+
+def profile_startup() -> None:
+    phases = []
+
+    def measure(name: str, func: Callable[[], object]) -> None:
+        with elapsed_timer() as elapsed:
+            func()
+        phases.append((name, elapsed()))
+
+    async def check_schema() -> None:
+        database = importlib.import_module("freyr.database")
+        await database.create_db_and_tables()
+        await database.engine.dispose()
+
+    def load_templates() -> None:
+        templates = importlib.import_module("freyr.routers.html").get_templates()
+        folder = get_project() / "templates"
+        for file in folder.rglob("*.jinja"):
+            templates.get_template(file.relative_to(folder).as_posix())
+
+    measure(name="Load settings", func=lambda: constants.settings)
+    measure(name="Import database", func=lambda: importlib.import_module("freyr.database"))
+    measure(name="Import web app", func=lambda: importlib.import_module("freyr.__main__"))
+    measure(name="Import server", func=lambda: importlib.import_module("uvicorn"))
+    measure(name="Setup logging", func=setup_logging)
+    measure(name="Check schema", func=lambda: asyncio.run(check_schema()))
+    measure(name="Load templates", func=load_templates)
+
+    total = sum(x for _, x in phases)
+    table = Table(title="Startup Profile")
+    table.add_column("Phase")
+    table.add_column("Time (ms)", justify="right")
+    table.add_column("Share", justify="right")
+    for name, seconds in phases:
+        table.add_row(name, f"{seconds * 1000:.1f}", f"{seconds / total:.0%}")
+    table.add_row("Total", f"{total * 1000:.1f}", "", style="bold")
+    CONSOLE.print(table)
+
 
 def main() -> None:
+    parser = ArgumentParser(prog="Freyr")
+    parser.add_argument(
+        "--rebuild-rollups",
+        action="store_true",
+        help="Recalculate the hourly/daily/monthly/yearly rollups from all stored readings.",
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Move duplicate readings of a device and timestamp to a backup table, keeping the"
+        " earliest.",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Apply the retention policy once, folding expired readings into the rollups.",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Time each phase of starting Freyr, then exit without serving.",
+    )
+    args = parser.parse_args()
+
+    if args.rebuild_rollups:
+        asyncio.run(rebuild_rollups())
+        return
+    if args.dedupe:
+        asyncio.run(dedupe())
+        return
+    if args.compact:
+        asyncio.run(compact())
+        return
+    if args.profile_startup:
+        profile_startup()
+        return
+
+    workers = constants.settings.website.workers
+    if workers > 1 and not constants.settings.website.reload:
+        from freyr.database import SCHEMA_READY  # noqa: PLC0415
+
+        # Create the schema once here instead of in every worker.
+        asyncio.run(prepare_workers())
+        os.environ[SCHEMA_READY] = "1"
+
+    import uvicorn  # noqa: PLC0415
+
     with contextlib.suppress(KeyboardInterrupt):
         uvicorn.run(
             "freyr.__main__:app",
@@ -14,7 +171,9 @@ def main() -> None:
             use_colors=True,
             server_header=False,
             reload=constants.settings.website.reload,
+            workers=workers,
             log_config=None,
+            timeout_graceful_shutdown=constants.settings.website.shutdown_timeout,
         )
 
 
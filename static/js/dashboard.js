@@ -62,10 +62,13 @@ function updateColumn(name, reading) {
   feelsLabel.textContent = `${feelsLike}°C`;
 }
 
+const DEVICES = new Map();
+
 async function getCurrentReadings() {
   const response = await submitRequest("/api/devices", "GET");
   if (!response || response.length === 0) {
-    createNoContent();
+    if (!document.getElementById("no-content"))
+      createNoContent();
     return;
   }
 
@@ -74,14 +77,37 @@ async function getCurrentReadings() {
     noContent.remove();
 
   for (const device of response) {
-    const readings = await submitRequest(`/api/devices/${device.id}/readings?limit=1`, "GET");
-    const reading = readings ? readings[0] || null : null;
-
     if (!document.getElementById(device.name))
       createColumn(device.name);
-    updateColumn(device.name, reading);
+    DEVICES.set(device.id, device);
+    updateColumn(device.name, device.reading);
+  }
+}
+
+function applyReading(reading) {
+  const device = DEVICES.get(reading.device_id);
+  if (!device) {
+    getCurrentReadings();
+    return;
   }
+  if (device.reading && device.reading.timestamp > reading.timestamp)
+    return;
+  device.reading = reading;
+  updateColumn(device.name, reading);
+}
+
+function refreshTimes() {
+  for (const device of DEVICES.values())
+    updateColumn(device.name, device.reading);
+}
+
+function subscribeReadings() {
+  const source = new EventSource("/api/stream");
+  source.addEventListener("reading", (event) => applyReading(JSON.parse(event.data)));
+  // Readings were dropped or the connection was lost, reload the latest readings once.
+  source.addEventListener("missed", getCurrentReadings);
+  source.addEventListener("open", getCurrentReadings);
 }
 
-ready(getCurrentReadings);
-setInterval(getCurrentReadings, 1000 * 30); // Wait 30s
+ready(subscribeReadings);
+setInterval(refreshTimes, 1000 * 30); // Wait 30s
@@ -73,74 +73,157 @@ function createGraph(elementId, labels, datasets) {
     }
   };
 
-  new Chart(document.getElementById(elementId), config);
+  return new Chart(document.getElementById(elementId), config);
 }
 
-async function loadReadings(device_id, timeframe, timeFormat, params = {}) {
-  const response = await submitRequest(`/api/devices/${device_id}/readings/${timeframe}?${new URLSearchParams(params)}`, "GET");
-  if (!response)
-    return;
+const COLUMNS = "application/x-freyr-columns";
+const COLUMN_NAMES = ["tempHigh", "tempAvg", "tempLow", "humidHigh", "humidAvg", "humidLow"];
 
-  addLoading(`${timeframe}-stats`);
-  const labels = [];
-  const datasets = [];
+const TIME_FORMATS = { yearly: "YYYY", monthly: "MMM", daily: "Do", hourly: "hhA" };
+// The page filters each timeframe's chart is limited to.
+const SCOPES = { yearly: [], monthly: ["year"], daily: ["year", "month"], hourly: ["year", "month", "day"] };
+
+function unpackColumns(buffer, start = 0) {
+  // Layout is documented in freyr/responses.py, every column is aligned so it can be viewed in place.
+  const count = new DataView(buffer).getUint32(start + 4, true);
+  const bitmapSize = Math.ceil(count / 8);
+  const timestamps = new BigInt64Array(buffer, start + 8, count);
+  const columns = {};
+
+  let offset = start + 8 + count * 8;
+  for (const name of COLUMN_NAMES) {
+    columns[name] = new Float32Array(buffer, offset, count);
+    offset += count * 4;
+  }
+  for (const name of COLUMN_NAMES) {
+    const values = columns[name];
+    const bitmap = new Uint8Array(buffer, offset, bitmapSize);
+    columns[name] = (index) => (bitmap[index >> 3] >> (index & 7)) & 1 ? values[index] : null;
+    offset += bitmapSize;
+  }
+  // Summaries are padded to 8 bytes so the next one's timestamps stay aligned.
+  return { count, timestamps, columns, end: offset + (-offset & 7) };
+}
+
+async function fetchSummaries(device_id, timeframes, params) {
+  const query = new URLSearchParams({ timeframes: timeframes.join(","), ...params });
+  try {
+    const response = await fetch(`/api/devices/${device_id}/readings/summary?${query}`, {
+      method: "GET",
+      headers: { ...HEADERS, "Accept": COLUMNS },
+    });
+
+    if (!response.ok)
+      throw response;
+    const buffer = await response.arrayBuffer();
+    const summaries = [];
+    let offset = 0;
+    for (const _ of timeframes) {
+      const summary = unpackColumns(buffer, offset);
+      summaries.push(summary);
+      offset = summary.end;
+    }
+    return summaries;
+  } catch(error) {
+    return null;
+  }
+}
 
-  const tempRange = [];
-  const tempAverage = [];
-  const humidRange = [];
-  const humidAverage = [];
+const CHARTS = new Map();
 
-  for (const [index, high] of response.highs.entries()) {
-    const avg = response.averages[index];
-    const low = response.lows[index];
+function buildDatasets(response, timeFormat) {
+  const { count, timestamps, columns } = response;
+  const labels = new Array(count);
+  const datasets = [];
 
-    labels.push(moment(high.timestamp).format(timeFormat));
-    tempRange.push([high.temperature, low.temperature]);
-    tempAverage.push(avg.temperature);
-    humidRange.push([high.humidity, low.humidity]);
-    humidAverage.push(avg.humidity);
+  const tempRange = new Array(count);
+  const tempAverage = new Array(count);
+  const humidRange = new Array(count);
+  const humidAverage = new Array(count);
+
+  for (let index = 0; index < count; index++) {
+    labels[index] = moment.utc(Number(timestamps[index]) * 1000).format(timeFormat);
+    tempRange[index] = [columns.tempHigh(index), columns.tempLow(index)];
+    tempAverage[index] = columns.tempAvg(index);
+    humidRange[index] = [columns.humidHigh(index), columns.humidLow(index)];
+    humidAverage[index] = columns.humidAvg(index);
   }
 
   datasets.push(createDataset(0, tempRange, "Temperature (High/Low)", "bar", "yTem"));
   datasets.push(createDataset(1, tempAverage, "Temperature (Avg)", "line", "yTem"));
   datasets.push(createDataset(2, humidRange, "Humidity (High/Low)", "bar", "yHum"));
   datasets.push(createDataset(3, humidAverage, "Humidity (Avg)", "line", "yHum"));
-
-  createGraph(`${timeframe}-stats`, labels, datasets);
-  removeLoading(`${timeframe}-stats`);
-}
-
-function loadYearlyReadings(device_id) {
-  loadReadings(device_id, "yearly", "YYYY");
-  toggleChartLoading("yearly-stats");
+  return { labels, datasets };
 }
 
-function loadMonthlyReadings(device_id) {
+function pageParams() {
   const currentParams = new URLSearchParams(window.location.search);
-  const params = {
+  return {
     year: currentParams.get("year") || 0,
+    month: currentParams.get("month") || 0,
+    day: currentParams.get("day") || 0,
   };
-  loadReadings(device_id, "monthly", "MMM", params);
-  toggleChartLoading("monthly-stats");
 }
 
-function loadDailyReadings(device_id) {
-  const currentParams = new URLSearchParams(window.location.search);
-  const params = {
-    year: currentParams.get("year") || 0,
-    month: currentParams.get("month") || 0,
-  };
-  loadReadings(device_id, "daily", "Do", params);
-  toggleChartLoading("daily-stats");
+async function loadSummaries(device_id, timeframes) {
+  for (const timeframe of timeframes)
+    toggleChartLoading(`${timeframe}-stats`);
+  const params = pageParams();
+  const summaries = await fetchSummaries(device_id, timeframes, params);
+  if (!summaries)
+    return;
+
+  timeframes.forEach((timeframe, index) => {
+    addLoading(`${timeframe}-stats`);
+    const { labels, datasets } = buildDatasets(summaries[index], TIME_FORMATS[timeframe]);
+    const chart = createGraph(`${timeframe}-stats`, labels, datasets);
+    const scope = Object.fromEntries(SCOPES[timeframe].map((key) => [key, params[key]]));
+    CHARTS.set(timeframe, { chart, params: scope });
+    removeLoading(`${timeframe}-stats`);
+  });
 }
 
-function loadHourlyReadings(device_id) {
-  const currentParams = new URLSearchParams(window.location.search);
-  const params = {
-    year: currentParams.get("year") || 0,
-    month: currentParams.get("month") || 0,
-    day: currentParams.get("day") || 0,
-  };
-  loadReadings(device_id, "hourly", "hhA", params);
-  toggleChartLoading("hourly-stats");
+async function refreshSummaries(device_id, timeframes) {
+  const summaries = await fetchSummaries(device_id, timeframes, pageParams());
+  if (!summaries)
+    return;
+
+  timeframes.forEach((timeframe, index) => {
+    const { chart } = CHARTS.get(timeframe);
+    const { labels, datasets } = buildDatasets(summaries[index], TIME_FORMATS[timeframe]);
+    chart.data.labels = labels;
+    datasets.forEach((dataset, position) => chart.data.datasets[position].data = dataset.data);
+    chart.update("none");
+  });
+}
+
+function coversReading(params, timestamp) {
+  const date = moment.utc(timestamp);
+  return (!Number(params.year) || date.year() === Number(params.year))
+    && (!Number(params.month) || date.month() + 1 === Number(params.month))
+    && (!Number(params.day) || date.date() === Number(params.day));
+}
+
+const STALE = new Set();
+let refreshTimer = null;
+
+function applyReading(device_id, reading) {
+  for (const [timeframe, { params }] of CHARTS) {
+    if (reading === null || coversReading(params, reading.timestamp))
+      STALE.add(timeframe);
+  }
+  // Readings usually arrive in bursts, refresh the affected charts once per burst.
+  if (STALE.size === 0 || refreshTimer !== null)
+    return;
+  refreshTimer = setTimeout(() => {
+    refreshSummaries(device_id, [...STALE]);
+    STALE.clear();
+    refreshTimer = null;
+  }, 1000 * 5);
+}
+
+function subscribeReadings(device_id) {
+  const source = new EventSource(`/api/stream?device_id=${device_id}`);
+  source.addEventListener("reading", (event) => applyReading(device_id, JSON.parse(event.data)));
+  source.addEventListener("missed", () => applyReading(device_id, null));
 }
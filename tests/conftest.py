@@ -0,0 +1,64 @@
+import asyncio
+import os
+import tempfile
+from collections.abc import Callable, Coroutine, Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Settings and the engine are created on import, so they're pointed at a scratch folder first.
+ROOT = Path(tempfile.mkdtemp(prefix="freyr-tests-"))
+for name in ("XDG_CACHE_HOME", "XDG_CONFIG_HOME", "XDG_DATA_HOME"):
+    os.environ[name] = str(ROOT / name.lower())
+
+from freyr.constants import constants  # noqa: E402
+from freyr.settings import Source  # noqa: E402
+
+constants.settings.database.source = Source.SQLITE
+constants.settings.database.name = str(ROOT / "freyr.sqlite")
+
+from sqlmodel import SQLModel  # noqa: E402
+
+from freyr.cache import SUMMARY_CACHE  # noqa: E402
+from freyr.database import create_db_and_tables, engine  # noqa: E402
+
+Runner = Callable[[Coroutine[Any, Any, Any]], Any]
+
+
+def _run(coroutine: Coroutine[Any, Any, Any]) -> Any:  # noqa: ANN401
+    async def wrapper() -> Any:  # noqa: ANN401
+        try:
+            return await coroutine
+        finally:
+            # Pooled connections belong to this loop, each test runs in a new one.
+            await engine.dispose()
+
+    return asyncio.run(wrapper())
+
+
+@pytest.fixture
+def run() -> Runner:
+    return _run
+
+
+@pytest.fixture(autouse=True)
+def database() -> None:
+    async def reset() -> None:
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.drop_all)
+        await create_db_and_tables()
+
+    _run(reset())
+    SUMMARY_CACHE._entries.clear()  # noqa: SLF001
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch) -> Iterator[TestClient]:
+    from freyr import __main__  # noqa: PLC0415
+
+    # Logs are written next to the project, not into the scratch folder.
+    monkeypatch.setattr(__main__, "setup_logging", lambda: None)
+    with TestClient(__main__.app) as client:
+        yield client
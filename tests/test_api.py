@@ -0,0 +1,53 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from freyr.ingest import NDJSON
+
+
+def test_get_device_includes_readings(client: TestClient) -> None:
+    device = client.post("/api/devices", json={"name": "Kitchen"}).json()
+    for timestamp, temperature in (("2024-01-01T10:00:00", 20.5), ("2024-01-01T11:00:00", 21)):
+        client.post(
+            f"/api/devices/{device['id']}/readings",
+            json={"timestamp": timestamp, "temperature": temperature},
+        ).raise_for_status()
+
+    response = client.get(f"/api/devices/{device['id']}")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["name"] == "Kitchen"
+    assert [x["timestamp"] for x in body["readings"]] == [
+        "2024-01-01T11:00:00",
+        "2024-01-01T10:00:00",
+    ]
+    assert "reading" not in body
+
+
+def test_get_device_not_found(client: TestClient) -> None:
+    assert client.get("/api/devices/404").status_code == 404
+
+
+@pytest.mark.parametrize(
+    ("export_format", "media_type"),
+    [("csv", "text/csv"), ("CSV", "text/csv"), ("ndjson", NDJSON), ("Ndjson", NDJSON)],
+)
+def test_export_format_is_case_insensitive(
+    client: TestClient, export_format: str, media_type: str
+) -> None:
+    device = client.post("/api/devices", json={"name": "Kitchen"}).json()
+
+    response = client.get(
+        f"/api/devices/{device['id']}/readings/export", params={"format": export_format}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith(media_type)
+
+
+def test_export_rejects_unknown_formats(client: TestClient) -> None:
+    device = client.post("/api/devices", json={"name": "Kitchen"}).json()
+
+    response = client.get(f"/api/devices/{device['id']}/readings/export", params={"format": "xml"})
+
+    assert response.status_code == 422
@@ -0,0 +1,88 @@
+from collections.abc import Callable
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from freyr.cache import SUMMARY_CACHE
+from freyr.constants import constants
+from freyr.database import engine
+from freyr.models import Device, Reading, Timeframe
+from freyr.retention import compact
+from freyr.rollups import rebuild_rollups
+from freyr.routers.api import etag_matches
+
+ETAG = '"abc"'
+KEY = {
+    "device_id": 1,
+    "timeframes": (Timeframe.DAILY,),
+    "year": None,
+    "month": None,
+    "day": None,
+    "offset": 0,
+    "limit": 100,
+    "media_type": "application/json",
+}
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        (None, False),
+        ('"abc"', True),
+        ('"other"', False),
+        ('"other", "abc"', True),
+        ('"other","abc"', True),
+        ('W/"abc"', True),
+        ("*", True),
+        ('"ab"', False),
+    ],
+)
+def test_etag_matches(header: str | None, expected: bool) -> None:
+    assert etag_matches(header=header, etag=ETAG) is expected
+
+
+def test_summary_not_modified(client: TestClient) -> None:
+    device = client.post("/api/devices", json={"name": "Kitchen"}).json()
+    client.post(
+        f"/api/devices/{device['id']}/readings",
+        json={"timestamp": "2024-01-01T10:00:00", "temperature": 20},
+    ).raise_for_status()
+    url = f"/api/devices/{device['id']}/readings/daily"
+    etag = client.get(url).headers["ETag"]
+
+    assert client.get(url, headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_rebuild_rollups_invalidates_summaries(run: Callable) -> None:
+    async def rebuild() -> None:
+        async with AsyncSession(engine) as session:
+            session.add(Device(id=1, name="Kitchen"))
+            session.add(Reading(device_id=1, timestamp=datetime(2024, 1, 1), temperature=20))
+            await session.commit()
+            await rebuild_rollups(session=session)
+            await session.commit()
+
+    before = SUMMARY_CACHE.key(**KEY).generation
+    run(rebuild())
+
+    assert SUMMARY_CACHE.key(**KEY).generation > before
+
+
+def test_compaction_invalidates_summaries(run: Callable, monkeypatch: pytest.MonkeyPatch) -> None:
+    async def compact_readings() -> int:
+        async with AsyncSession(engine) as session:
+            session.add(Device(id=1, name="Kitchen"))
+            session.add(Reading(device_id=1, timestamp=datetime(2024, 1, 1), temperature=20))
+            await session.commit()
+            await rebuild_rollups(session=session)
+            await session.commit()
+        before = SUMMARY_CACHE.key(**KEY).generation
+        await compact(now=datetime(2024, 6, 1))
+        return SUMMARY_CACHE.key(**KEY).generation - before
+
+    monkeypatch.setattr(constants.settings.retention, "enabled", True)
+
+    assert run(compact_readings()) > 0
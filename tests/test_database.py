@@ -0,0 +1,49 @@
+from collections.abc import Callable
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from freyr.database import DUPLICATES_TABLE, create_db_and_tables, engine, remove_duplicate_readings
+from freyr.models import Device, Reading
+
+
+async def _add_duplicates() -> None:
+    async with engine.begin() as connection:
+        await connection.execute(text("DROP INDEX ix_readings_device_id_timestamp"))
+    async with AsyncSession(engine) as session:
+        session.add(Device(id=1, name="Kitchen"))
+        for temperature in (20, 21, 22):
+            session.add(
+                Reading(device_id=1, timestamp=datetime(2024, 1, 1), temperature=temperature)
+            )
+        session.add(Reading(device_id=1, timestamp=datetime(2024, 1, 2), temperature=23))
+        await session.commit()
+
+
+def test_duplicates_block_startup(run: Callable) -> None:
+    run(_add_duplicates())
+
+    with pytest.raises(RuntimeError, match="2 duplicate readings"):
+        run(create_db_and_tables())
+
+
+def test_dedupe_backs_up_duplicates(run: Callable) -> None:
+    async def dedupe() -> tuple[int, list[int], list[int]]:
+        await _add_duplicates()
+        count = await remove_duplicate_readings()
+        await create_db_and_tables()
+        async with AsyncSession(engine) as session:
+            kept = (await session.exec(select(Reading.temperature).order_by(Reading.id))).all()
+            backup = await session.exec(
+                text(f"SELECT temperature FROM {DUPLICATES_TABLE} ORDER BY id")  # noqa: S608
+            )
+            return count, kept, backup.scalars().all()
+
+    count, kept, backup = run(dedupe())
+
+    assert count == 2
+    assert kept == [20, 23]
+    assert backup == [21, 22]
@@ -0,0 +1,101 @@
+import math
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from freyr.downsample import Row, lttb
+
+START = datetime(2024, 1, 1)
+
+
+def generate_rows(count: int, spike: int | None = None) -> list[Row]:
+    rows = []
+    for index in range(count):
+        temperature = Decimal(f"{20 + 5 * math.sin(index / 50):.2f}")
+        humidity = Decimal(f"{60 + 10 * math.cos(index / 70):.2f}")
+        if index == spike:
+            temperature = Decimal(90)
+        rows.append((index + 1, START + timedelta(minutes=index), temperature, humidity))
+    return rows
+
+
+def downsample(rows: list[Row], points: int) -> list[Row]:
+    return lttb(rows=rows, points=points, start=rows[0][1], end=rows[-1][1])
+
+
+@pytest.mark.parametrize("points", [3, 10, 100, 999])
+def test_returns_at_most_points(points: int) -> None:
+    assert len(downsample(rows=generate_rows(count=1_000), points=points)) <= points
+
+
+def test_keeps_first_and_last_rows() -> None:
+    rows = generate_rows(count=1_000)
+
+    result = downsample(rows=rows, points=50)
+
+    assert result[0] == rows[0]
+    assert result[-1] == rows[-1]
+
+
+def test_keeps_timestamp_order() -> None:
+    result = downsample(rows=generate_rows(count=1_000), points=50)
+
+    timestamps = [x[1] for x in result]
+    assert timestamps == sorted(timestamps)
+    assert len(set(timestamps)) == len(timestamps)
+
+
+def test_keeps_a_single_spike() -> None:
+    rows = generate_rows(count=1_000, spike=437)
+
+    assert rows[437] in downsample(rows=rows, points=20)
+
+
+def test_handles_gaps_and_missing_values() -> None:
+    rows = generate_rows(count=600)
+    # An outage of 200 rows, and another stretch where only humidity was recorded.
+    rows = rows[:200] + rows[400:]
+    rows[250:300] = [
+        (id_, timestamp, None, humidity) for id_, timestamp, _, humidity in rows[250:300]
+    ]
+    rows[320] = (rows[320][0], rows[320][1], None, None)
+
+    result = downsample(rows=rows, points=40)
+
+    assert 3 <= len(result) <= 40
+    assert result[0] == rows[0]
+    assert result[-1] == rows[-1]
+    assert [x[1] for x in result] == sorted(x[1] for x in result)
+
+
+def test_returns_few_rows_unchanged() -> None:
+    rows = generate_rows(count=2)
+
+    assert downsample(rows=rows, points=10) == rows
+
+
+def test_downsampled_endpoint(client: TestClient) -> None:
+    device = client.post("/api/devices", json={"name": "Kitchen"}).json()
+    rows = generate_rows(count=500, spike=321)
+    client.post(
+        f"/api/devices/{device['id']}/readings/batch",
+        json=[
+            {"timestamp": x.isoformat(), "temperature": str(y), "humidity": str(z)}
+            for _, x, y, z in rows
+        ],
+    ).raise_for_status()
+    url = f"/api/devices/{device['id']}/readings/downsampled"
+
+    response = client.get(url, params={"points": 25})
+
+    assert response.status_code == 200
+    timestamps = [datetime.fromisoformat(x["timestamp"]) for x in response.json()]
+    assert len(timestamps) <= 25
+    assert timestamps[0] == rows[0][1]
+    assert timestamps[-1] == rows[-1][1]
+    assert timestamps == sorted(timestamps)
+    assert rows[321][1] in timestamps
+    assert len(client.get(url, params={"points": 1_000}).json()) == 500
+    assert client.get(url, params={"points": 2}).status_code == 422
@@ -0,0 +1,24 @@
+import asyncio
+from collections.abc import Callable
+
+from freyr.events import EVENT_HUB, event_stream
+
+
+class OpenRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def test_close_ends_open_streams(run: Callable) -> None:
+    async def stream() -> tuple[int, list[str]]:
+        task = asyncio.create_task(collect())
+        await asyncio.sleep(0)
+        subscriptions = len(EVENT_HUB)
+        EVENT_HUB.close()
+        return subscriptions, await asyncio.wait_for(task, timeout=1)
+
+    async def collect() -> list[str]:
+        return [x async for x in event_stream(request=OpenRequest())]
+
+    assert run(stream()) == (1, ["retry: 5000\n\n"])
+    assert not len(EVENT_HUB)
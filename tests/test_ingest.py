@@ -0,0 +1,168 @@
+import asyncio
+from collections.abc import Callable
+from datetime import datetime
+from decimal import Decimal
+from time import monotonic
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from freyr import ingest
+from freyr.database import engine
+from freyr.ingest import COMPACTED, IngestQueue, ingest_readings
+from freyr.metrics import METRICS
+from freyr.models import (
+    BatchResult,
+    BatchStatus,
+    Compaction,
+    CompactionSource,
+    Conflict,
+    Device,
+    Reading,
+    ReadingCreate,
+)
+
+BROKEN = Decimal(-999)
+
+
+def test_batch_accepts_timezone_aware_timestamps(client: TestClient) -> None:
+    device = client.post("/api/devices", json={"name": "Kitchen"}).json()
+    timestamp = "2024-01-01T10:00:00+02:00"
+
+    response = client.post(
+        f"/api/devices/{device['id']}/readings/batch",
+        json=[{"timestamp": timestamp, "temperature": 20.5}],
+    )
+
+    assert response.status_code == 200
+    [result] = response.json()
+    assert result["status"] == "CREATED"
+    assert result["id"] is not None
+    readings = client.get(f"/api/devices/{device['id']}").json()["readings"]
+    local = datetime.fromisoformat(timestamp).astimezone().replace(tzinfo=None)
+    assert [x["timestamp"] for x in readings] == [local.isoformat()]
+    summary = client.get(f"/api/devices/{device['id']}/readings/hourly").json()
+    assert [Decimal(x["temperature"]) for x in summary["highs"]] == [Decimal("20.5")]
+
+
+def test_batch_rejects_unknown_devices(client: TestClient) -> None:
+    device = client.post("/api/devices", json={"name": "Kitchen"}).json()
+
+    response = client.post(
+        "/api/readings/batch",
+        json=[
+            {"device_id": device["id"], "timestamp": "2024-01-01T10:00:00", "temperature": 20},
+            {"device_id": 404, "timestamp": "2024-01-01T10:00:00", "temperature": 21},
+        ],
+    )
+
+    assert response.status_code == 200
+    assert [(x["status"], x["detail"]) for x in response.json()] == [
+        ("CREATED", None),
+        ("INVALID", "device_id: Device not found"),
+    ]
+
+
+def test_queue_only_drops_failing_readings(run: Callable, monkeypatch: pytest.MonkeyPatch) -> None:
+    async def failing(session: AsyncSession, items: list[ReadingCreate]) -> list[BatchResult]:
+        if any(x.temperature == BROKEN for x in items):
+            raise IntegrityError(statement=None, params=None, orig=Exception("Broken"))
+        return await ingest_readings(session=session, items=items)
+
+    async def flush() -> list[Decimal]:
+        async with AsyncSession(engine) as session:
+            session.add(Device(id=1, name="Kitchen"))
+            await session.commit()
+        batch = [
+            ReadingCreate(device_id=1, timestamp=datetime(2024, 1, 1, x), temperature=x)
+            for x in range(5)
+        ]
+        batch[3].temperature = BROKEN
+        await IngestQueue(maxsize=10, batch_size=10, flush_interval=1)._flush(batch=batch)  # noqa: SLF001
+        async with AsyncSession(engine) as session:
+            return (await session.exec(select(Reading.temperature).order_by(Reading.id))).all()
+
+    monkeypatch.setattr(ingest, "ingest_readings", failing)
+    dropped = METRICS.ingest_dropped._values.get(("invalid",), 0)  # noqa: SLF001
+
+    assert run(flush()) == [0, 1, 2, 4]
+    assert METRICS.ingest_dropped._values[("invalid",)] == dropped + 1  # noqa: SLF001
+
+
+def test_queue_retries_when_the_database_is_unavailable(
+    run: Callable, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    attempts = []
+
+    async def unavailable(session: AsyncSession, items: list[ReadingCreate]) -> list[BatchResult]:
+        attempts.append(len(items))
+        if len(attempts) < 3:
+            raise OperationalError(statement=None, params=None, orig=Exception("Locked"))
+        return await ingest_readings(session=session, items=items)
+
+    async def flush() -> list[Decimal]:
+        async with AsyncSession(engine) as session:
+            session.add(Device(id=1, name="Kitchen"))
+            await session.commit()
+        batch = [
+            ReadingCreate(device_id=1, timestamp=datetime(2024, 1, 1, x), temperature=x)
+            for x in range(5)
+        ]
+        await IngestQueue(maxsize=10, batch_size=10, flush_interval=1)._flush(batch=batch)  # noqa: SLF001
+        async with AsyncSession(engine) as session:
+            return (await session.exec(select(Reading.temperature).order_by(Reading.id))).all()
+
+    monkeypatch.setattr(ingest, "ingest_readings", unavailable)
+    monkeypatch.setattr(ingest, "RETRY_DELAY", 0.01)
+    dropped = dict(METRICS.ingest_dropped._values)  # noqa: SLF001
+
+    assert run(flush()) == [0, 1, 2, 3, 4]
+    assert attempts == [5, 5, 5]
+    assert METRICS.ingest_dropped._values == dropped  # noqa: SLF001
+
+
+def test_queue_stops_without_waiting_for_the_interval(run: Callable) -> None:
+    async def stop() -> tuple[float, list[Decimal]]:
+        async with AsyncSession(engine) as session:
+            session.add(Device(id=1, name="Kitchen"))
+            await session.commit()
+        queue = IngestQueue(maxsize=10, batch_size=10, flush_interval=5)
+        queue.start()
+        await asyncio.sleep(0.1)
+        queue.put(ReadingCreate(device_id=1, timestamp=datetime(2024, 1, 1), temperature=20))
+        await asyncio.sleep(0.1)
+        start = monotonic()
+        await queue.stop()
+        elapsed = monotonic() - start
+        async with AsyncSession(engine) as session:
+            return elapsed, (await session.exec(select(Reading.temperature))).all()
+
+    elapsed, temperatures = run(stop())
+
+    assert elapsed < 1
+    assert temperatures == [20]
+
+
+def test_updates_refused_before_the_compaction_watermark(run: Callable) -> None:
+    async def update() -> list[tuple[str, str | None]]:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            session.add(Device(id=1, name="Kitchen"))
+            session.add(
+                Compaction(source=CompactionSource.READINGS, timestamp=datetime(2024, 2, 1))
+            )
+            await session.commit()
+            results = await ingest_readings(
+                session=session,
+                items=[
+                    {"device_id": 1, "timestamp": "2024-01-31T23:00:00", "temperature": 20},
+                    {"device_id": 1, "timestamp": "2024-02-01T00:00:00", "temperature": 21},
+                ],
+                conflict=Conflict.UPDATE,
+            )
+            await session.commit()
+        return [(x.status, x.detail) for x in results]
+
+    assert run(update()) == [(BatchStatus.INVALID, COMPACTED), (BatchStatus.CREATED, None)]
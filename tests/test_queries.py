@@ -0,0 +1,197 @@
+import random
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from freyr import utils
+from freyr.database import engine
+from freyr.models import Device, Reading, Summary, Timeframe
+from freyr.queries import get_latest_readings, summarize_readings
+from freyr.rollups import GROUPINGS, summarize_reading_timeframes
+
+READINGS = {
+    Timeframe.YEARLY: (
+        utils.get_yearly_high_readings,
+        utils.get_yearly_average_readings,
+        utils.get_yearly_low_readings,
+    ),
+    Timeframe.MONTHLY: (
+        utils.get_monthly_high_readings,
+        utils.get_monthly_average_readings,
+        utils.get_monthly_low_readings,
+    ),
+    Timeframe.DAILY: (
+        utils.get_daily_high_readings,
+        utils.get_daily_average_readings,
+        utils.get_daily_low_readings,
+    ),
+    Timeframe.HOURLY: (
+        utils.get_hourly_high_readings,
+        utils.get_hourly_average_readings,
+        utils.get_hourly_low_readings,
+    ),
+}
+FILTERS = {
+    Timeframe.YEARLY: [{}],
+    Timeframe.MONTHLY: [{}, {"year": 2023}, {"year": 2024}],
+    Timeframe.DAILY: [{}, {"year": 2023}, {"year": 2024, "month": 2}],
+    Timeframe.HOURLY: [
+        {"year": 2023, "month": 12},
+        {"year": 2024, "month": 2, "day": 29},
+        {"year": 2024, "month": 1, "day": 1},
+    ],
+}
+
+
+def _value(rng: random.Random, low: float, high: float) -> Decimal | None:
+    return Decimal(f"{rng.uniform(low, high):.2f}") if rng.random() > 0.05 else None
+
+
+def generate_readings() -> list[Reading]:
+    rng = random.Random(2)  # noqa: S311
+    timestamp = datetime(2023, 11, 20)
+    readings = []
+    while timestamp < datetime(2024, 3, 10):
+        readings.append(
+            Reading(
+                device_id=1,
+                timestamp=timestamp,
+                temperature=_value(rng=rng, low=-5, high=35),
+                humidity=_value(rng=rng, low=20, high=95),
+            )
+        )
+        timestamp += timedelta(minutes=rng.randint(5, 50))
+    return readings
+
+
+def _rows(readings: list[Summary.Reading]) -> list[tuple]:
+    return [(x.timestamp, x.temperature, x.humidity) for x in readings]
+
+
+@pytest.mark.parametrize(
+    ("timeframe", "filters"), [(x, y) for x, values in FILTERS.items() for y in values]
+)
+def test_summarize_readings_matches_reference(
+    run: Callable, timeframe: Timeframe, filters: dict[str, int]
+) -> None:
+    readings = generate_readings()
+
+    async def summarize() -> Summary:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            session.add(Device(id=1, name="Reference"))
+            session.add(Device(id=2, name="Other"))
+            session.add_all(readings)
+            # Another device's readings mustn't leak into the summary.
+            session.add(Reading(device_id=2, timestamp=readings[0].timestamp, temperature=99))
+            await session.commit()
+            return await summarize_readings(
+                session=session, device_id=1, timeframe=timeframe, limit=10_000, **filters
+            )
+
+    summary = run(summarize())
+    highs, averages, lows = (x(readings=readings, **filters) for x in READINGS[timeframe])
+    assert summary.highs
+    assert _rows(summary.highs) == _rows(highs)
+    assert _rows(summary.averages) == _rows(averages)
+    assert _rows(summary.lows) == _rows(lows)
+
+
+@pytest.mark.parametrize(
+    ("timeframe", "filters"), [(x, y) for x, values in FILTERS.items() for y in values]
+)
+def test_summarize_reading_timeframes_matches_reference(
+    run: Callable, timeframe: Timeframe, filters: dict[str, int]
+) -> None:
+    readings = generate_readings()
+
+    async def summarize() -> Summary:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            session.add(Device(id=1, name="Reference"))
+            session.add_all(readings)
+            await session.commit()
+            summaries = await summarize_reading_timeframes(
+                session=session, device_id=1, timeframes=[timeframe], limit=10_000, **filters
+            )
+            return summaries[timeframe]
+
+    summary = run(summarize())
+    highs, averages, lows = (x(readings=readings, **filters) for x in READINGS[timeframe])
+    assert summary.highs
+    assert _rows(summary.highs) == _rows(highs)
+    assert _rows(summary.averages) == _rows(averages)
+    assert _rows(summary.lows) == _rows(lows)
+
+
+@pytest.mark.parametrize(
+    ("timeframe", "filters"), [(x, y) for x, values in FILTERS.items() for y in values]
+)
+def test_column_summary_matches_reference(timeframe: Timeframe, filters: dict[str, int]) -> None:
+    readings = generate_readings()
+    columns = utils.ReadingColumns.from_rows(
+        (x.timestamp, x.temperature, x.humidity) for x in readings
+    )
+
+    summary = utils.summarize(columns=columns, grouping=GROUPINGS[timeframe], **filters)
+
+    highs, averages, lows = (x(readings=readings, **filters) for x in READINGS[timeframe])
+    assert _rows(summary.highs) == _rows(highs)
+    assert _rows(summary.averages) == _rows(averages)
+    assert _rows(summary.lows) == _rows(lows)
+
+
+def test_column_summary_rounds_like_the_reference() -> None:
+    # 20.105 rounds to 20.10, a float sum lands on 20.105000000000000426 and rounds to 20.11.
+    columns = utils.ReadingColumns.from_rows(
+        [
+            (datetime(2024, 1, 1, 0), Decimal("20.10"), None),
+            (datetime(2024, 1, 1, 1), Decimal("20.11"), None),
+        ]
+    )
+
+    summary = utils.summarize(columns=columns, grouping=utils.day_grouping)
+
+    assert _rows(summary.averages) == [(datetime(2024, 1, 1), Decimal("20.10"), None)]
+
+
+def test_get_latest_readings(run: Callable) -> None:
+    async def latest() -> dict[int, datetime]:
+        async with AsyncSession(engine) as session:
+            for device_id in (1, 2, 3):
+                session.add(Device(id=device_id, name=f"Device {device_id}"))
+            for hour in range(5):
+                session.add(Reading(device_id=1, timestamp=datetime(2024, 1, 1, hour)))
+                session.add(Reading(device_id=2, timestamp=datetime(2024, 1, 2, hour)))
+            await session.commit()
+            readings = await get_latest_readings(session=session, device_ids=[1, 2, 3])
+        return {x: y.timestamp for x, y in readings.items()}
+
+    assert run(latest()) == {1: datetime(2024, 1, 1, 4), 2: datetime(2024, 1, 2, 4)}
+
+
+def test_get_latest_readings_seeks_each_device(run: Callable) -> None:
+    async def plan() -> list[str]:
+        statements = []
+
+        def capture(*args: object) -> None:
+            statements.append(args[2:4])
+
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            async with AsyncSession(engine) as session:
+                await get_latest_readings(session=session, device_ids=[1, 2])
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+        statement, parameters = statements[-1]
+        async with engine.connect() as connection:
+            rows = await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return [x[3] for x in rows]
+
+    # Matching readings on the device alone would read every reading the device has.
+    assert (
+        "SEARCH readings USING INDEX ix_readings_device_id_timestamp (device_id=? AND timestamp=?)"
+        in run(plan())
+    )
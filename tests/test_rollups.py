@@ -0,0 +1,63 @@
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import event, func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from freyr.database import engine
+from freyr.models import Device, Reading, Rollup, Timeframe
+from freyr.rollups import update_rollups
+
+DEVICES = 3
+HOURS = 2_000
+# Stock SQLite's limit, Postgres allows 65,535.
+PARAMETER_LIMIT = 32_766
+
+
+def test_update_rollups_chunks_large_batches(run: Callable) -> None:
+    async def update() -> tuple[list[int], dict[Timeframe, tuple[int, int, Decimal]]]:
+        parameters = []
+
+        def capture(*args: object) -> None:
+            if args[2].startswith("INSERT INTO rollups"):
+                parameters.append(len(args[3]))
+
+        async with AsyncSession(engine) as session:
+            for device_id in range(1, DEVICES + 1):
+                session.add(Device(id=device_id, name=f"Device {device_id}"))
+            readings = [
+                Reading(
+                    device_id=device_id,
+                    timestamp=datetime(2024, 1, 1) + timedelta(hours=hour),
+                    temperature=Decimal("20.50"),
+                    humidity=Decimal(50),
+                )
+                for device_id in range(1, DEVICES + 1)
+                for hour in range(HOURS)
+            ]
+            event.listen(engine.sync_engine, "before_cursor_execute", capture)
+            try:
+                # The second batch only updates existing rollups.
+                await update_rollups(session=session, readings=readings)
+                await update_rollups(session=session, readings=readings)
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", capture)
+            await session.commit()
+            query = select(
+                Rollup.timeframe,
+                func.count(),
+                func.sum(Rollup.temperature_count),
+                func.max(Rollup.temperature_sum),
+            ).group_by(Rollup.timeframe)
+            return parameters, {x: (y, z, total) for x, y, z, total in await session.exec(query)}
+
+    parameters, rollups = run(update())
+
+    assert len(parameters) > 2
+    assert max(parameters) <= PARAMETER_LIMIT
+    assert rollups[Timeframe.HOURLY][0] == DEVICES * HOURS
+    assert all(x[1] == 2 * DEVICES * HOURS for x in rollups.values())
+    assert rollups[Timeframe.HOURLY][2] == Decimal("41.00")
+    assert rollups[Timeframe.YEARLY][0] == DEVICES